@@ -8,7 +8,11 @@ from GlyphsApp import *
 from GlyphsApp.plugins import *
 from GlyphsApp.UI import *
 from vanilla import *
-import math
+from PyObjCTools.AppHelper import callAfter
+from multi_line_app import CHUNK_SIZE, ChunkedRun, FontTransaction, MetricsSync, StagedGlyph, font_designspace, interpolation_layers, path_from_gspath, gspath_from_path
+from multi_line_compat import check_glyph, print_report
+from multi_line_engine import Settings, OFFSET_TOLERANCE, GENERATION_KEY, generate_glyph, compact_bracket_layers, generation_key, line_stroke_widths, offset_paths, offset_deviation, parse_line_widths
+from multi_line_profile import NULL_PROFILER, Profiler
 
 # Configuration
 # ============
@@ -49,91 +53,56 @@ SPACING_ADJUSTMENT_MASTER4 = -30  # Spacing adjustment for Master 4
 # Stroke placement
 STROKE_PLACEMENT = 0  # 0 = left, 1 = center, 2 = right
 
+# Offsetting
+USE_OFFSET_FILTER = False  # True = offset every path with GlyphsFilterOffsetCurve instead of the built-in engine
+VERIFY_OFFSET = False  # True = compare the built-in offset against the filter and report deviations above OFFSET_TOLERANCE
+
+# Compatibility
+CHECK_COMPATIBILITY = True  # True = check interpolation compatibility of the generated glyphs after each run
+SHOW_COMPATIBILITY_WARNINGS = False  # True = also list warnings, e.g. master layers replaced by bracket layers
+
+# Profiling
+PROFILE = False  # True = print time per stage and the slowest glyphs to the Macro panel after each run
+
 def filterForName(name):
     for filter in Glyphs.filters:
         if filter.__class__.__name__ == name:
             return filter
 
-def set_stroke_attributes(path, width, height):
-    """Helper function to set stroke attributes with proper line caps"""
-    path.attributes['strokeWidth'] = width
-    path.attributes['strokeHeight'] = height
-    # Don't set line caps here, they will be copied from original path
-
-def create_offset_path(original_path, offset_value, is_centered=False):
-    """Helper function to create offset path while preserving stroke attributes"""
-    # Create a copy of the path
-    offset_path = original_path.copy()
-    
-    # Adjust offset value if stroke is centered
-    if is_centered:
-        offset_value = offset_value / 2
-    
-    # Apply Offset Curve filter with exact parameters
+def filter_offset_path(path, horizontal, vertical):
+    """Offset a path with the Offset Curve filter, returns None if the filter produced nothing"""
     temp_layer = GSLayer()
-    temp_layer.shapes.append(offset_path)
+    temp_layer.shapes.append(gspath_from_path(path))
     offsetCurveFilter = filterForName('GlyphsFilterOffsetCurve')
-    offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', str(offset_value), str(offset_value), '0', '0.5'])
-    
+    offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', str(horizontal), str(vertical), '0', '0.5'])
     if len(temp_layer.paths) > 0:
-        offset_path = temp_layer.paths[0]
-        # Copy all stroke attributes from original path
-        for attr in ['lineCapStart', 'lineCapEnd', 'strokeWidth', 'strokeHeight', 'strokePos']:
-            if attr in original_path.attributes:
-                offset_path.attributes[attr] = original_path.attributes[attr]
-    
-    return offset_path
-
-
-
-def calculate_diagonal_offset(path, desired_distance):
-    """
-    Calculate the offset vector and correction needed to ensure
-    that the measured distance between the duplicated paths at 90 degrees
-    is exactly desired_distance.
-
-    Returns (normal_x, normal_y, corrected_offset_per_side)
-    """
-    if len(path.nodes) < 2:
-        return (0, 0, desired_distance)
-
-    node1 = path.nodes[0]
-    node2 = path.nodes[1]
-
-    dx = node2.x - node1.x
-    dy = node2.y - node1.y
-
-    length = math.hypot(dx, dy)
-    if length == 0:
-        return (0, 0, desired_distance)
-
-    # Normalize the direction vector
-    dx /= length
-    dy /= length
-
-    # Calculate the angle
-    angle_rad = math.atan2(dy, dx)
-
-    # Normal vector (90 degree rotated)
-    normal_x = dy
-    normal_y = -dx
-
-    # For horizontal lines (dy ≈ 0), we want to use the full offset
-    if abs(dy) < 1e-6:
-        return (0, 1, desired_distance / 2)  # Return vertical normal for horizontal lines
-
-    # For vertical lines (dx ≈ 0), we want to use the full offset
-    if abs(dx) < 1e-6:
-        return (1, 0, desired_distance / 2)  # Return horizontal normal for vertical lines
-
-    # For diagonal lines, calculate the correction factor
-    correction_factor = abs(math.sin(angle_rad))  # if measuring horizontally
-    if correction_factor == 0:
-        correction_factor = 1e-6  # avoid division by zero
-
-    corrected_offset_per_side = (desired_distance / 2) / correction_factor
+        return path_from_gspath(temp_layer.paths[0])
+    return None
+
+def filter_offset_paths(requests):
+    """Batch interface of the engine, one filter round-trip per path"""
+    return [filter_offset_path(path, horizontal, vertical) for path, horizontal, vertical in requests]
+
+def verified_offset_paths(requests):
+    """Built-in offset, checked path by path against the Offset Curve filter"""
+    results = offset_paths(requests)
+    for (path, horizontal, vertical), result, reference in zip(requests, results, filter_offset_paths(requests)):
+        if reference is None:
+            continue
+        deviation = offset_deviation(result, reference)
+        if deviation is None:
+            print(f"Offset {horizontal}/{vertical}: filter returned a different node structure")
+        elif deviation > OFFSET_TOLERANCE:
+            print(f"Offset {horizontal}/{vertical}: built-in offset deviates {deviation:.2f} units from the filter")
+    return results
 
-    return (normal_x, normal_y, corrected_offset_per_side)
+def offset_function():
+    """None lets the engine offset with its built-in normals index"""
+    if USE_OFFSET_FILTER:
+        return filter_offset_paths
+    if VERIFY_OFFSET:
+        return verified_offset_paths
+    return None
 
 
 
@@ -145,9 +114,14 @@ class MultiLineVariableUI:
         self.medium_stroke_width = 35
         self.max_stroke_width = 60
         self.maintain_y_position = True  # Default to True
+        self.line_count = 2  # Parallel lines per stroke
+        self.line_widths = ""  # Stroke width of every line per master, empty spreads min/medium/max over the lines
+        self.skip_unchanged = True  # Skip glyphs whose master 1 and settings are unchanged since the last run
+        self.chunk_size = CHUNK_SIZE  # Glyphs written to the font at a time, smaller chunks update the progress sooner
+        self.run = None
         
         # Create the window with a reduced height
-        self.w = FloatingWindow((400, 340), "Multi Line Variable Settings")
+        self.w = FloatingWindow((400, 630), "Multi Line Variable Settings")
         
         # Create UI elements
         y = 10
@@ -174,15 +148,44 @@ class MultiLineVariableUI:
         self.w.max_stroke_width = EditText((10, y, 380, 22), "", callback=self.saveSettings)
         y += 40
         
+        self.w.line_count_label = TextBox((10, y, 380, 22), "Lines per Stroke:")
+        y += 25
+        self.w.line_count = EditText((10, y, 380, 22), "", callback=self.saveSettings)
+        y += 40
+        
+        self.w.line_widths_label = TextBox((10, y, 380, 22), "Line Widths per Master (e.g. min;min;medium,min,min;…):")
+        y += 25
+        self.w.line_widths = EditText((10, y, 380, 22), "", callback=self.saveSettings)
+        y += 40
+        
+        self.w.skip_unchanged = CheckBox((10, y, 380, 22), "Skip unchanged glyphs", callback=self.saveSettings)
+        y += 30
+        
+        self.w.chunk_size_label = TextBox((10, y, 380, 22), "Glyphs per Chunk:")
+        y += 25
+        self.w.chunk_size = EditText((10, y, 380, 22), "", callback=self.saveSettings)
+        y += 40
+        
         # Add some padding before the button
-        y += 20
+        y += 10
         
         # Process button with larger size and more padding
-        self.w.process_button = Button((10, y, 380, 32), "Process Selected Glyphs", callback=self.process_glyphs)
+        self.w.process_button = Button((10, y, 285, 32), "Process Selected Glyphs", callback=self.process_glyphs)
+        self.w.cancel_button = Button((300, y, 90, 32), "Cancel", callback=self.cancel_processing)
+        self.w.cancel_button.enable(False)
+        y += 42
+        
+        # Progress of the running generation
+        self.w.progress = ProgressBar((10, y, 380, 16))
+        y += 22
+        self.w.counter = TextBox((10, y, 380, 22), "")
         
         # Load saved settings
         self.loadSettings()
         
+        # Closing the window cancels a running generation, committed chunks stay
+        self.w.bind("close", self.cancel_processing)
+        
         # Show window
         self.w.open()
     
@@ -198,6 +201,10 @@ class MultiLineVariableUI:
         self.min_stroke_width = self.safe_float(self.w.min_stroke_width.get(), 10)
         self.medium_stroke_width = self.safe_float(self.w.medium_stroke_width.get(), 40)
         self.max_stroke_width = self.safe_float(self.w.max_stroke_width.get(), 80)
+        self.line_count = max(1, int(self.safe_float(self.w.line_count.get(), 2)))
+        self.line_widths = self.w.line_widths.get()
+        self.skip_unchanged = bool(self.w.skip_unchanged.get())
+        self.chunk_size = max(1, int(self.safe_float(self.w.chunk_size.get(), CHUNK_SIZE)))
     
     def loadSettings(self):
         # Load all settings into UI
@@ -205,8 +212,24 @@ class MultiLineVariableUI:
         self.w.min_stroke_width.set(str(self.min_stroke_width))
         self.w.medium_stroke_width.set(str(self.medium_stroke_width))
         self.w.max_stroke_width.set(str(self.max_stroke_width))
+        self.w.line_count.set(str(self.line_count))
+        self.w.line_widths.set(self.line_widths)
+        self.w.skip_unchanged.set(self.skip_unchanged)
+        self.w.chunk_size.set(str(self.chunk_size))
+    
+    def set_running(self, running, total=0):
+        self.w.process_button.enable(not running)
+        self.w.cancel_button.enable(running)
+        if running:
+            self.total = total
+            self.w.progress.getNSProgressIndicator().setMaxValue_(max(1, total))
+            self.w.progress.set(0)
+            self.w.counter.set(f"0 / {total} glyphs")
     
     def process_glyphs(self, sender):
+        if self.run is not None:
+            return
+        
         # Get the current font
         font = Glyphs.font
         
@@ -216,228 +239,114 @@ class MultiLineVariableUI:
             print("No glyph selected")
             return
         
-        # Get all masters
+        # Generated layers go to the first five masters
         master1 = font.masters[0]
-        master2 = font.masters[1]
-        master3 = font.masters[2]
-        master4 = font.masters[3]
-        master5 = font.masters[4]
         
-        # Get the Offset Curve filter
-        offsetCurveFilter = filterForName('GlyphsFilterOffsetCurve')
+        try:
+            settings = Settings(self.original_offset, self.min_stroke_width, self.medium_stroke_width, self.max_stroke_width, self.maintain_y_position, self.line_count, parse_line_widths(self.line_widths))
+            line_stroke_widths(settings)
+        except ValueError as e:
+            print(f"Line widths: {e}")
+            return
+        
+        self.font = font
+        self.settings = settings
+        self.key_context = [(master.id, master.name) for master in font.masters] + [axis.axisTag for axis in font.axes]
+        self.offsets = offset_function()
+        self.profiler = Profiler() if PROFILE else NULL_PROFILER
+        # Generation may run on a worker thread, its timings are merged when the run ends
+        self.generate_profiler = Profiler() if PROFILE else NULL_PROFILER
+        self.metrics = MetricsSync(font, self.profiler)
+        self.committed = []
+        self.skipped = []  # Filled by the worker thread, printed from the main thread
+        self.synced = 0
         
-        # Process the selected glyph
+        # --- Read master 1 of every selected glyph, generation works on these copies only ---
+        jobs = []
         for layer in selected_glyphs:
             glyph = layer.parent
-            
-            # Store original paths from master layer
-            original_paths = [path.copy() for path in glyph.layers[master1.id].paths]
-            
-            # Get list of all layer IDs to delete (non-master layers)
-            layers_to_delete = []
-            for current_layer in glyph.layers:
-                if not current_layer.isMasterLayer:
-                    layers_to_delete.append(current_layer.layerId)
-            
-            # Delete layers in reverse order to avoid index issues
-            for layer_id in sorted(layers_to_delete, reverse=True):
-                del glyph.layers[layer_id]
-            
-            # Clear all paths from master layers
-            for master_layer in [glyph.layers[master1.id], glyph.layers[master2.id], glyph.layers[master3.id], glyph.layers[master4.id], glyph.layers[master5.id]]:
-                master_layer.clear()
-            
-            # Get the layers for each master
             layer1 = glyph.layers[master1.id]
-            layer2 = glyph.layers[master2.id]
-            layer3 = glyph.layers[master3.id]
-            layer4 = glyph.layers[master4.id]
-            layer5 = glyph.layers[master5.id]
-            
-            # Store original spacing and calculate proportions
-            original_LSB = layer1.LSB
-            original_RSB = layer1.RSB
-            original_total_sidebearings = original_LSB + original_RSB
-            lsb_proportion = original_LSB / original_total_sidebearings if original_total_sidebearings > 0 else 0.5
-            
-            # Get original glyph width (this will be maintained across masters)
-            original_width = layer1.width
+            with self.profiler.glyph(glyph.name):
+                with self.profiler.stage('convert'):
+                    original_paths = [path_from_gspath(path) for path in layer1.paths]
+            jobs.append((glyph, glyph.name, original_paths, layer1.width, glyph.userData[GENERATION_KEY]))
+        
+        # The Offset Curve filter needs the main thread, the built-in offset runs in the background
+        self.set_running(True, len(jobs))
+        self.run = ChunkedRun(jobs, self.stage_glyph, self.commit_chunk, self.finish_run, self.chunk_size, callAfter, in_background=self.offsets is None)
+        self.run.start()
+    
+    def stage_glyph(self, job):
+        """Generated layers of one glyph in memory, without touching the font"""
+        glyph, name, original_paths, width, previous_key = job
+        profiler = self.generate_profiler
+        with profiler.glyph(name):
+            # Skip glyphs generated from the same master 1 and settings before
+            with profiler.stage('key'):
+                key = generation_key(original_paths, width, self.settings, self.key_context)
+            if self.skip_unchanged and previous_key == key:
+                self.skipped.append(name)
+                return None
             
-            # --- Create processed paths: tag originals and duplicates ---
-            processed_paths_master1 = []
-            processed_paths_other = []
-            for path in original_paths:
-                is_centered = path.attributes.get('strokePos', 0) == 0
-                if is_centered and self.maintain_y_position:
-                    # For centered paths, create two offset paths using diagonal logic
-                    # First path: shifted in positive direction
-                    path1 = path.copy()
-                    temp_layer = GSLayer()
-                    temp_layer.shapes.append(path1)
-                    normal_x, normal_y, offset = calculate_diagonal_offset(path1, self.original_offset)
-                    if abs(normal_x) < 1e-6:  # If line is vertical
-                        y_offset = offset / normal_y if abs(normal_y) > 1e-6 else offset
-                        offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', '0', str(y_offset), '0', '0.5'])
-                    else:
-                        x_offset = offset / normal_x
-                        offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', str(x_offset), '0', '0', '0.5'])
-                    if len(temp_layer.paths) > 0:
-                        path1 = temp_layer.paths[0]
-                        for attr in ['lineCapStart', 'lineCapEnd', 'strokeWidth', 'strokeHeight', 'strokePos']:
-                            if attr in path.attributes:
-                                path1.attributes[attr] = path.attributes[attr]
-                        path1.attributes['mlv_type'] = 'duplicate'
-                        path1.attributes['offset_direction'] = 0
-                        processed_paths_other.append(path1)
-                    # Second path: shifted in negative direction
-                    path2 = path.copy()
-                    temp_layer = GSLayer()
-                    temp_layer.shapes.append(path2)
-                    normal_x, normal_y, offset = calculate_diagonal_offset(path2, self.original_offset)
-                    if abs(normal_x) < 1e-6:
-                        y_offset = -offset / normal_y if abs(normal_y) > 1e-6 else -offset
-                        offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', '0', str(y_offset), '0', '0.5'])
-                    else:
-                        x_offset = -offset / normal_x
-                        offsetCurveFilter.processLayer_withArguments_(temp_layer, ['OffsetCurve', str(x_offset), '0', '0', '0.5'])
-                    if len(temp_layer.paths) > 0:
-                        path2 = temp_layer.paths[0]
-                        for attr in ['lineCapStart', 'lineCapEnd', 'strokeWidth', 'strokeHeight', 'strokePos']:
-                            if attr in path.attributes:
-                                path2.attributes[attr] = path.attributes[attr]
-                        path2.attributes['mlv_type'] = 'duplicate'
-                        path2.attributes['offset_direction'] = 1
-                        processed_paths_other.append(path2)
-                    # Only add the original to master 1
-                    orig = path.copy()
-                    orig.attributes['mlv_type'] = 'original'
-                    processed_paths_master1.append(orig)
-                else:
-                    # For non-centered or not maintaining Y, keep original and create offset path
-                    orig = path.copy()
-                    orig.attributes['mlv_type'] = 'original'
-                    processed_paths_master1.append(orig)
-                    processed_paths_other.append(orig.copy())
-                    offset_path = create_offset_path(path, self.original_offset, is_centered)
-                    offset_path.attributes['mlv_type'] = 'duplicate'
-                    processed_paths_other.append(offset_path)
+            # --- Create processed paths, master paths and bracket paths ---
+            master_paths, bracket_paths = generate_glyph(original_paths, self.settings, self.offsets, profiler)
+            # Bracket layers equal to their master layer are left out, the master layer stands in for them
+            with profiler.stage('compact_brackets'):
+                bracket_paths = compact_bracket_layers(master_paths, bracket_paths)
+            # Original glyph width is maintained across masters, LSB/RSB are synced with the chunk
+            return StagedGlyph(glyph, master_paths, bracket_paths, width, key)
+    
+    def commit_chunk(self, staged_glyphs, done):
+        """Main thread: write one chunk in one transaction, rolled back if anything fails"""
+        with FontTransaction(self.font, self.profiler) as transaction:
+            for staged in staged_glyphs:
+                self.metrics.mark(staged.glyph, transaction.commit(staged))
             
-            # --- Bracket layers: all paths thickness 10 ---
-            def add_bracket_layer(master, bracket_layer, thickness):
-                bracket_layer.associatedMasterId = master.id
-                bracket_layer.attributes["axisRules"] = {} if master==master1 else {"a01": {"max": 100}, "a02": {"max": 100}}
-                if master == master1:
-                    # For master 1 bracket layer, add only the offset/duplicate paths for centered, and original+offset for non-centered
-                    for path in processed_paths_other:
-                        new_path = path.copy()
-                        set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                        bracket_layer.shapes.append(new_path)
-                else:
-                    # For other masters, only add original (pre-offset) paths
-                    for path in original_paths:
-                        new_path = path.copy()
-                        set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                        bracket_layer.shapes.append(new_path)
-                # Now set LSB/RSB to match the original master width and proportions
-                bracket_layer.width = original_width
-                paths_width = bracket_layer.bounds.size.width
-                total_sidebearings = bracket_layer.width - paths_width
-                bracket_layer.LSB = total_sidebearings * lsb_proportion
-                bracket_layer.RSB = total_sidebearings * (1 - lsb_proportion)
-                bracket_layer.updateMetrics()
-                glyph.layers.append(bracket_layer)
-
-            add_bracket_layer(master1, GSLayer(), self.min_stroke_width)
-            add_bracket_layer(master2, GSLayer(), self.min_stroke_width)
-            add_bracket_layer(master3, GSLayer(), self.min_stroke_width)
-            add_bracket_layer(master4, GSLayer(), self.min_stroke_width)
-            add_bracket_layer(master5, GSLayer(), self.min_stroke_width)
-
-            # --- Master 1: only original paths (thickness min_stroke_width) ---
-            for path in processed_paths_master1:
-                if path.attributes.get('mlv_type') == 'original':
-                    new_path = path.copy()
-                    set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                    layer1.shapes.append(new_path)
-
-            # --- Master 2: original and duplicate as before (use min_stroke_width for both) ---
-            for path in processed_paths_other:
-                new_path = path.copy()
-                set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                layer2.shapes.append(new_path)
-
-            # --- Master 3: original=medium, duplicate=min (for diagonals, offset_direction 0=medium, 1=min) ---
-            for path in processed_paths_other:
-                new_path = path.copy()
-                if path.attributes.get('mlv_type') == 'original':
-                    set_stroke_attributes(new_path, self.medium_stroke_width, self.medium_stroke_width)
-                elif path.attributes.get('mlv_type') == 'duplicate' and 'offset_direction' in path.attributes:
-                    if path.attributes['offset_direction'] == 0:
-                        set_stroke_attributes(new_path, self.medium_stroke_width, self.medium_stroke_width)
-                    else:
-                        set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                else:
-                    set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                layer3.shapes.append(new_path)
-
-            # --- Master 4: original=min, duplicate=max (for diagonals, offset_direction 0=min, 1=max) ---
-            for path in processed_paths_other:
-                new_path = path.copy()
-                if path.attributes.get('mlv_type') == 'original':
-                    set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                elif path.attributes.get('mlv_type') == 'duplicate' and 'offset_direction' in path.attributes:
-                    if path.attributes['offset_direction'] == 0:
-                        set_stroke_attributes(new_path, self.min_stroke_width, self.min_stroke_width)
-                    else:
-                        set_stroke_attributes(new_path, self.max_stroke_width, self.max_stroke_width)
-                else:
-                    set_stroke_attributes(new_path, self.max_stroke_width, self.max_stroke_width)
-                layer4.shapes.append(new_path)
-
-            # --- Master 5: both original and duplicate = max_stroke_width ---
-            for path in processed_paths_other:
-                new_path = path.copy()
-                set_stroke_attributes(new_path, self.max_stroke_width, self.max_stroke_width)
-                layer5.shapes.append(new_path)
-
-            # --- Sidebearings and metrics sync ---
-            for current_layer in [layer2, layer3, layer4, layer5]:
-                paths_width = current_layer.bounds.size.width
-                total_sidebearings = original_width - paths_width
-                current_layer.LSB = total_sidebearings * lsb_proportion
-                current_layer.RSB = total_sidebearings * (1 - lsb_proportion)
-                current_layer.updateMetrics()
-
-            # Call sync_master_widths at the end of processing
-            sync_master_widths()
-
-# --- Sync all layers' widths and sidebearings to the first master (reference logic) ---
-def sync_master_widths():
-    font = Glyphs.font
-    selected_glyphs = font.selectedLayers
-    if not selected_glyphs:
-        print("No glyph selected")
-        return
-    for layer in selected_glyphs:
-        glyph = layer.parent
-        first_master = glyph.layers[0]
-        if not first_master:
-            print(f"No master layers found in {glyph.name}")
-            continue
-        original_LSB = first_master.LSB
-        original_RSB = first_master.RSB
-        original_total_sidebearings = original_LSB + original_RSB
-        lsb_proportion = original_LSB / original_total_sidebearings if original_total_sidebearings > 0 else 0.5
-        original_width = first_master.width
-        for current_layer in glyph.layers:
-            if current_layer == first_master:
-                continue
-            paths_width = current_layer.bounds.size.width
-            total_sidebearings = original_width - paths_width
-            current_layer.LSB = total_sidebearings * lsb_proportion
-            current_layer.RSB = total_sidebearings * (1 - lsb_proportion)
-            current_layer.updateMetrics()
-    print("Sync Master Widths: Process completed")
+            # --- Sidebearings and metrics sync of the chunk, so every committed glyph is complete ---
+            self.synced += self.metrics.sync()
+        self.committed.extend(staged_glyphs)
+        self.w.progress.set(done)
+        self.w.counter.set(f"{done} / {self.total} glyphs")
+    
+    def cancel_processing(self, sender):
+        if self.run is not None:
+            self.run.cancel()
+            self.w.counter.set("Cancelling…")
+    
+    def finish_run(self, cancelled, error):
+        """Main thread: reports, once the last chunk is committed or the run was cancelled or failed"""
+        done = self.run.done
+        self.run = None
+        self.set_running(False)
+        for name in self.skipped:
+            print(f"{name}: unchanged, skipped")
+        print(f"Sync Master Widths: {self.synced} glyphs synced")
+        if error is not None:
+            job, exception = error
+            where = f"generating {job[1]}" if job is not None else "writing a chunk"
+            print(f"Error {where}: {exception}")
+            print(f"Failed after {done} of {self.total} glyphs, {len(self.committed)} generated glyphs were kept")
+            status = ", failed"
+        elif cancelled:
+            print(f"Cancelled after {done} of {self.total} glyphs, {len(self.committed)} generated glyphs were kept")
+            status = ", cancelled"
+        else:
+            status = ""
+        self.w.counter.set(f"{done} / {self.total} glyphs{status}")
+        
+        # --- Interpolation compatibility of everything that was generated ---
+        if CHECK_COMPATIBILITY and self.committed:
+            report = {}
+            designspace = font_designspace(self.font)
+            for staged in self.committed:
+                problems = check_glyph(*interpolation_layers(self.font, staged.glyph, len(staged.master_paths)), designspace)
+                if problems:
+                    report[staged.glyph.name] = problems
+            print_report(report, SHOW_COMPATIBILITY_WARNINGS)
+        if self.profiler.enabled:
+            self.profiler.merge(self.generate_profiler.data())
+            print(self.profiler.format_report())
+        self.committed = []
 
 # Run the UI
 MultiLineVariableUI()
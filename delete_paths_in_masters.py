@@ -1,46 +1,33 @@
 # MenuTitle: Delete Paths in Masters
 # -*- coding: utf-8 -*-
 __doc__="""
-Deletes all paths from all masters of the currently selected glyph.
+Deletes all paths from all masters of the selected glyphs, or of the glyphs matching GLYPH_NAMES.
+Components stay. With DELETE_OTHER_LAYERS bracket and other non-master layers are deleted too.
+Each glyph is reset in one undo step, with one assignment per layer.
 """
 
-def DeleteAllPaths(thisLayer):
-	thisLayer.parent.beginUndo()
-	
-	for i in range(len(thisLayer.shapes)-1, -1, -1):
-		path = thisLayer.shapes[i]
-		if isinstance(path, GSPath):
-			del thisLayer.shapes[i]
+from multi_line_app import FontTransaction, target_glyphs
 
-	thisLayer.parent.endUndo()
+# Glyph names or patterns to reset instead of the selection, e.g. ["A", "a.*"]
+GLYPH_NAMES = []
+# Also delete bracket and other non-master layers
+DELETE_OTHER_LAYERS = False
 
 # Get the current font
 font = Glyphs.font
 
-# Check if a font is open and a glyph is selected
-if font and font.selectedLayers:
-	# Get the current glyph
-	current_glyph = font.selectedLayers[0].parent
-	
-	if current_glyph:
-		# Disable interface updates for better performance
-		font.disableUpdateInterface()
-		
+if font:
+	glyphs = target_glyphs(font, GLYPH_NAMES)
+	if glyphs:
 		try:
-			# Process all masters
-			for master in font.masters:
-				# Get the layer for this master
-				layer = current_glyph.layers[master.id]
-				DeleteAllPaths(layer)
-				print(f"Cleared paths in master: {master.name}")
-			
-			print("Done!")
+			# One interface suspend and one undo group per glyph for the whole run
+			with FontTransaction(font) as transaction:
+				for glyph in glyphs:
+					transaction.reset(glyph, font.masters, other_layers=DELETE_OTHER_LAYERS)
+			print(f"Cleared paths in {len(glyphs)} glyphs, {len(font.masters)} masters")
 		except Exception as e:
 			print(f"An error occurred: {str(e)}")
-		finally:
-			# Always re-enable interface updates
-			font.enableUpdateInterface()
 	else:
-		print("Could not get current glyph")
+		print("No glyphs selected")
 else:
-	print("No font open or no glyph selected")
\ No newline at end of file
+	print("No font open")
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Minimal reader/writer for the OpenStep plist format used by .glyphs files.
+Inline arrays such as node tuples and anchor positions are read as tuples and
+written back inline, everything else round-trips in the Glyphs 3 layout.
+GlyphsFile reads large files glyph by glyph and rewrites only the glyphs that changed.
+"""
+
+import os
+import re
+
+_BARE_STRING = re.compile(r'^[A-Za-z0-9_.]+$')
+_INT = re.compile(r'^-?\d+$')
+_FLOAT = re.compile(r'^-?(\d+\.\d*|\.\d+)$')
+_DELIMITERS = set(' \t\r\n;,=(){}"')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\'}
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def skip_whitespace(self):
+        text = self.text
+        length = len(text)
+        while self.pos < length:
+            char = text[self.pos]
+            if char in ' \t\r\n':
+                self.pos += 1
+            elif text.startswith('//', self.pos):
+                end = text.find('\n', self.pos)
+                self.pos = length if end == -1 else end + 1
+            elif text.startswith('/*', self.pos):
+                end = text.find('*/', self.pos)
+                self.pos = length if end == -1 else end + 2
+            else:
+                break
+
+    def expect(self, char):
+        self.skip_whitespace()
+        if self.text[self.pos:self.pos + 1] != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def parse_value(self):
+        self.skip_whitespace()
+        char = self.text[self.pos:self.pos + 1]
+        if char == '{':
+            return self.parse_dict()
+        if char == '(':
+            return self.parse_array()
+        if char == '"':
+            return self.parse_quoted()
+        if not char:
+            raise ValueError("Unexpected end of file")
+        return self.parse_bare()
+
+    def parse_dict(self):
+        self.pos += 1
+        result = {}
+        while True:
+            self.skip_whitespace()
+            if self.text[self.pos:self.pos + 1] == '}':
+                self.pos += 1
+                return result
+            key = self.parse_value()
+            if not isinstance(key, str):
+                key = str(key)
+            self.expect('=')
+            result[key] = self.parse_value()
+            self.expect(';')
+
+    def parse_array(self):
+        self.pos += 1
+        # Glyphs writes points and nodes on one line, real lists one item per line
+        inline = self.text[self.pos:self.pos + 1] not in ('\n', '\r')
+        items = []
+        while True:
+            self.skip_whitespace()
+            if self.text[self.pos:self.pos + 1] == ')':
+                self.pos += 1
+                return tuple(items) if inline else items
+            items.append(self.parse_value())
+            self.skip_whitespace()
+            if self.text[self.pos:self.pos + 1] == ',':
+                self.pos += 1
+
+    def parse_quoted(self):
+        text = self.text
+        self.pos += 1
+        chunks = []
+        start = self.pos
+        while True:
+            end = text.find('"', self.pos)
+            backslash = text.find('\\', self.pos, end if end != -1 else len(text))
+            if end == -1:
+                raise ValueError("Unterminated string")
+            if backslash == -1:
+                chunks.append(text[start:end])
+                self.pos = end + 1
+                return ''.join(chunks)
+            chunks.append(text[start:backslash])
+            escaped = text[backslash + 1]
+            if escaped in _ESCAPES:
+                chunks.append(_ESCAPES[escaped])
+                self.pos = backslash + 2
+            elif escaped in 'Uu':
+                chunks.append(chr(int(text[backslash + 2:backslash + 6], 16)))
+                self.pos = backslash + 6
+            elif escaped.isdigit():
+                chunks.append(chr(int(text[backslash + 1:backslash + 4], 8)))
+                self.pos = backslash + 4
+            else:
+                chunks.append(escaped)
+                self.pos = backslash + 2
+            start = self.pos
+
+    def parse_bare(self):
+        text = self.text
+        start = self.pos
+        length = len(text)
+        while self.pos < length and text[self.pos] not in _DELIMITERS:
+            self.pos += 1
+        token = text[start:self.pos]
+        if not token:
+            raise ValueError(f"Unexpected '{text[start:start + 1]}' at offset {start}")
+        if _INT.match(token):
+            return int(token)
+        if _FLOAT.match(token):
+            return float(token)
+        return token
+
+
+def loads(text):
+    """Parse the text of a .glyphs file into dicts, lists, tuples, strings and numbers"""
+    parser = _Parser(text)
+    value = parser.parse_value()
+    parser.skip_whitespace()
+    if parser.pos != len(text):
+        raise ValueError(f"Unexpected data at offset {parser.pos}")
+    return value
+
+
+def load(file_path):
+    with open(file_path, encoding='utf-8') as f:
+        return loads(f.read())
+
+
+def format_number(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def format_string(value):
+    if _BARE_STRING.match(value) and not _INT.match(value) and not _FLOAT.match(value):
+        return value
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _write(value, out, inline=False):
+    if isinstance(value, dict):
+        if inline:
+            out.append('{')
+            for key, item in value.items():
+                out.append(format_string(key) + ' = ')
+                _write(item, out, True)
+                out.append(';')
+            out.append('}')
+        else:
+            out.append('{\n')
+            for key, item in value.items():
+                out.append(format_string(key) + ' = ')
+                _write(item, out)
+                out.append(';\n')
+            out.append('}')
+    elif isinstance(value, tuple):
+        out.append('(')
+        for index, item in enumerate(value):
+            if index:
+                out.append(',')
+            _write(item, out, True)
+        out.append(')')
+    elif isinstance(value, list):
+        out.append('(\n')
+        for index, item in enumerate(value):
+            if index:
+                out.append(',\n')
+            _write(item, out)
+        out.append('\n)' if value else ')')
+    elif isinstance(value, str):
+        out.append(format_string(value))
+    else:
+        out.append(format_number(value))
+
+
+def dumps(value):
+    """Serialize a parsed .glyphs structure back to text"""
+    out = []
+    _write(value, out)
+    out.append('\n')
+    return ''.join(out)
+
+
+def dump(value, file_path):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(dumps(value))
+
+
+# --- Indexed files ---
+
+# Strings, arrays of one-line arrays like node lists and single one-line arrays (both depth
+# neutral), and structure brackets
+_TOKENS = re.compile(rb'"(?:[^"\\]|\\.)*"|\((?:\s*\([^()"{}\n]*\),?)*\s*\)|\([^()"{}\n]*\)|[{}()]', re.S)
+_GLYPHS_KEY = re.compile(rb'(?:^|[\s;{])glyphs\s*=\s*$')
+_GLYPHNAME = re.compile(rb'glyphname\s*=\s*("(?:[^"\\]|\\.)*"|[^;\s]+)\s*;')
+
+# Untouched ranges are copied in pieces of this size
+COPY_CHUNK = 1 << 20
+
+
+class GlyphsFile:
+    """
+    A .glyphs file read through a memory map, with a byte-offset index of the entries of
+    its glyphs array. Glyphs are parsed one at a time on demand, and save() splices the
+    glyphs passed to it into the original bytes, copying everything else as it is.
+    Top-level values besides the glyphs are parsed only when header() is asked for.
+
+        with GlyphsFile(path) as source:
+            font = source.font(names)  # header with only these glyphs parsed
+            ...
+            source.save(path, changed_glyphs)
+    """
+
+    def __init__(self, file_path):
+        import mmap
+
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self._file.close()
+            raise ValueError(f"{file_path} is empty")
+        self.entries = []
+        self.offsets = {}
+        self.parsed = {}
+        self._header = None
+        self._scan()
+
+    def _scan(self):
+        data = self._map
+        depth = 0
+        array_start = None
+        entry_start = None
+        for match in _TOKENS.finditer(data):
+            start = match.start()
+            char = data[start]
+            if char == 0x22 or match.end() - start > 1:
+                continue
+            if char in (0x7b, 0x28):
+                if depth == 1 and char == 0x28 and array_start is None and _GLYPHS_KEY.search(data[max(0, start - 64):start]):
+                    array_start = start
+                elif depth == 2 and char == 0x7b and array_start is not None:
+                    entry_start = start
+                depth += 1
+                continue
+            depth -= 1
+            if array_start is None:
+                continue
+            if depth == 2 and entry_start is not None:
+                self._add_entry(entry_start, match.end())
+                entry_start = None
+            elif depth == 1:
+                self.array = (array_start, match.end())
+                return
+        raise ValueError(f"No glyphs found in {self.file_path}")
+
+    def _add_entry(self, start, end):
+        match = _GLYPHNAME.search(self._map, start, end)
+        name = None
+        if match:
+            token = match.group(1).decode('utf-8')
+            name = loads(token) if token.startswith('"') else token
+            name = str(name)
+        self.entries.append((start, end, name))
+        self.offsets.setdefault(name, (start, end))
+
+    @property
+    def names(self):
+        return [name for _, _, name in self.entries]
+
+    def glyph(self, name):
+        """Parsed glyph dict, parsed once and kept"""
+        if name not in self.parsed:
+            start, end = self.offsets[name]
+            self.parsed[name] = loads(self._map[start:end].decode('utf-8'))
+        return self.parsed[name]
+
+    def header(self):
+        """The top-level dict without glyphs ('glyphs' stays in place as an empty list)"""
+        if self._header is None:
+            start, end = self.array
+            data = self._map
+            self._header = loads((data[:start] + b'()' + data[end:]).decode('utf-8'))
+        return self._header
+
+    def font(self, names=None):
+        """A font dict like load() returns, with the glyphs of `names` (default: all) in file order"""
+        font = dict(self.header())
+        wanted = set(self.names if names is None else names)
+        font['glyphs'] = [self.glyph(name) for name in self.names if name in wanted]
+        return font
+
+    def _copy(self, f, start, end):
+        while start < end:
+            stop = min(end, start + COPY_CHUNK)
+            f.write(self._map[start:stop])
+            start = stop
+
+    def save(self, file_path=None, glyphs=()):
+        """Write the file with `glyphs` replacing the entries of the same name, to `file_path` or in place"""
+        file_path = file_path or self.file_path
+        replacements = {glyph['glyphname']: glyph for glyph in glyphs}
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            position = 0
+            for start, end, name in self.entries:
+                if name not in replacements:
+                    continue
+                self._copy(f, position, start)
+                # dumps() ends with a newline that the entry doesn't include
+                f.write(dumps(replacements.pop(name))[:-1].encode('utf-8'))
+                position = end
+            self._copy(f, position, len(self._map))
+        if os.path.abspath(file_path) == os.path.abspath(self.file_path):
+            self.close()
+        os.replace(temp_path, file_path)
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Minimal stand-in for the GlyphsApp module, enough to run the shared scripts outside the app.
+Only what the scripts in this folder touch is implemented, geometry is kept in plain
+Python objects and the Offset Curve filter is backed by the built-in engine offset.
+
+    import glyphsapp_stub
+    glyphsapp_stub.install()  # afterwards `from GlyphsApp import *` resolves to this module
+"""
+
+import sys
+import uuid
+
+from multi_line_engine import Node, Path, offset_path
+
+__all__ = ['GSFont', 'GSFontMaster', 'GSAxis', 'GSGlyph', 'GSLayer', 'GSPath', 'GSNode', 'GSComponent', 'GSInstance', 'Glyphs', 'NSPoint', 'NSRect', 'NSSize', 'INSTANCETYPESINGLE', 'INSTANCETYPEVARIABLE']
+
+INSTANCETYPESINGLE = 0
+INSTANCETYPEVARIABLE = 1
+
+
+def install():
+    """Register this module as GlyphsApp unless the real one is importable"""
+    if 'GlyphsApp' in sys.modules:
+        return sys.modules['GlyphsApp']
+    try:
+        import GlyphsApp
+        return GlyphsApp
+    except ImportError:
+        sys.modules['GlyphsApp'] = sys.modules[__name__]
+        return sys.modules[__name__]
+
+
+class NSPoint:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class NSSize:
+    __slots__ = ('width', 'height')
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+
+class NSRect:
+    __slots__ = ('origin', 'size')
+
+    def __init__(self, x, y, width, height):
+        self.origin = NSPoint(x, y)
+        self.size = NSSize(width, height)
+
+
+class GSNode:
+    def __init__(self, position=(0, 0), type='line'):
+        self.position = NSPoint(position[0], position[1])
+        self.type = type
+        self.smooth = False
+        self.userData = UserData()
+
+    def copy(self):
+        node = GSNode((self.position.x, self.position.y), self.type)
+        node.smooth = self.smooth
+        node.userData.update(self.userData)
+        return node
+
+
+class GSPath:
+    def __init__(self):
+        self.nodes = []
+        self.closed = True
+        self.attributes = {}
+        self.parent = None
+
+    def copy(self):
+        path = GSPath()
+        path.nodes = [node.copy() for node in self.nodes]
+        path.closed = self.closed
+        path.attributes = dict(self.attributes)
+        return path
+
+
+class GSComponent:
+    def __init__(self, name, position=(0, 0)):
+        self.componentName = name
+        self.position = NSPoint(position[0], position[1])
+        self.parent = None
+
+    def copy(self):
+        return GSComponent(self.componentName, (self.position.x, self.position.y))
+
+
+class GSLayer:
+    def __init__(self):
+        self.layerId = None
+        self.associatedMasterId = None
+        self.name = None
+        self.parent = None
+        self.width = 600
+        self.attributes = {}
+        self._shapes = []
+        self.anchors = []
+        self.hints = []
+
+    @property
+    def shapes(self):
+        return self._shapes
+
+    @shapes.setter
+    def shapes(self, shapes):
+        self._shapes = list(shapes)
+
+    @property
+    def paths(self):
+        return [shape for shape in self._shapes if isinstance(shape, GSPath)]
+
+    @property
+    def components(self):
+        return [shape for shape in self._shapes if isinstance(shape, GSComponent)]
+
+    @property
+    def isMasterLayer(self):
+        return self.associatedMasterId is None or self.associatedMasterId == self.layerId
+
+    @property
+    def bounds(self):
+        """Bounds of the node positions, strokes are not expanded"""
+        xs = [node.position.x for path in self.paths for node in path.nodes]
+        ys = [node.position.y for path in self.paths for node in path.nodes]
+        if not xs:
+            return NSRect(0, 0, 0, 0)
+        return NSRect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+    def clear(self):
+        self._shapes = []
+        self.anchors = []
+        self.hints = []
+
+    def applyTransform(self, transform):
+        a, b, c, d, tx, ty = transform
+        for path in self.paths:
+            for node in path.nodes:
+                x, y = node.position.x, node.position.y
+                node.position = NSPoint(a * x + c * y + tx, b * x + d * y + ty)
+
+    def updateMetrics(self):
+        pass
+
+    def copy(self):
+        layer = GSLayer()
+        layer.layerId = self.layerId
+        layer.associatedMasterId = self.associatedMasterId
+        layer.name = self.name
+        layer.width = self.width
+        layer.attributes = dict(self.attributes)
+        layer._shapes = [shape.copy() for shape in self._shapes]
+        layer.anchors = list(self.anchors)
+        layer.hints = list(self.hints)
+        return layer
+
+
+class GlyphLayersProxy:
+    """glyph.layers: iterable, indexed by position or layer id"""
+
+    def __init__(self, glyph):
+        self.glyph = glyph
+        self.items = []
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _index(self, key):
+        if isinstance(key, int):
+            return key
+        for index, layer in enumerate(self.items):
+            if layer.layerId == key:
+                return index
+        return None
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        return self.items[index] if index is not None else None
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        if index is not None:
+            del self.items[index]
+
+    def append(self, layer):
+        if layer.layerId is None:
+            layer.layerId = str(uuid.uuid4()).upper()
+        layer.parent = self.glyph
+        self.items.append(layer)
+
+
+class UserData(dict):
+    """Returns None for missing keys like the app's userData proxy"""
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __delitem__(self, key):
+        self.pop(key, None)
+
+
+class GSGlyph:
+    def __init__(self, name=None):
+        self.name = name
+        self.parent = None
+        self.layers = GlyphLayersProxy(self)
+        self.userData = UserData()
+        self.undo_depth = 0
+
+    def beginUndo(self):
+        self.undo_depth += 1
+
+    def endUndo(self):
+        self.undo_depth -= 1
+
+
+class GSFontMaster:
+    def __init__(self, name=None, id=None, axes=None):
+        self.name = name
+        self.id = id or str(uuid.uuid4()).upper()
+        self.axes = list(axes or [])
+
+
+class GSInstance:
+    def __init__(self, name=None, type=INSTANCETYPESINGLE):
+        self.name = name
+        self.type = type
+        self.customParameters = UserData()
+
+
+class GSAxis:
+    def __init__(self, name=None, tag=None):
+        self.name = name
+        self.axisTag = tag
+
+
+class GSFont:
+    def __init__(self):
+        self.masters = []
+        self.axes = []
+        self.instances = []
+        self.glyphs = []
+        self.selectedLayers = []
+        self.update_interface_disabled = 0
+
+    def glyph(self, name):
+        for glyph in self.glyphs:
+            if glyph.name == name:
+                return glyph
+        return None
+
+    def addGlyph(self, glyph):
+        glyph.parent = self
+        for master in self.masters:
+            if glyph.layers[master.id] is None:
+                layer = GSLayer()
+                layer.layerId = master.id
+                glyph.layers.append(layer)
+        self.glyphs.append(glyph)
+
+    def disableUpdateInterface(self):
+        self.update_interface_disabled += 1
+
+    def enableUpdateInterface(self):
+        self.update_interface_disabled -= 1
+
+
+def _path_from_gspath(gspath):
+    nodes = [Node(node.position.x, node.position.y, node.type, node.smooth) for node in gspath.nodes]
+    return Path.from_nodes(nodes, gspath.closed, dict(gspath.attributes))
+
+
+def _gspath_from_path(path):
+    gspath = GSPath()
+    for node in path.nodes:
+        gsnode = GSNode((node.x, node.y), node.type)
+        gsnode.smooth = node.smooth
+        gspath.nodes.append(gsnode)
+    gspath.closed = path.closed
+    gspath.attributes = dict(path.attributes)
+    return gspath
+
+
+class GlyphsFilterOffsetCurve:
+    """Offset Curve without Make Stroke, computed by the engine"""
+
+    def processLayer_withArguments_(self, layer, arguments):
+        horizontal, vertical = float(arguments[1]), float(arguments[2])
+        layer.shapes = [_gspath_from_path(offset_path(_path_from_gspath(shape), horizontal, vertical)) if isinstance(shape, GSPath) else shape for shape in layer.shapes]
+
+
+class GlyphsStub:
+    def __init__(self):
+        self.font = None
+        self.filters = [GlyphsFilterOffsetCurve()]
+
+
+Glyphs = GlyphsStub()
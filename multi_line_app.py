@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+GlyphsApp side of the Multi Line Variable scripts, shared by the scripts in this folder.
+"""
+
+import fnmatch
+import threading
+
+from GlyphsApp import *
+from multi_line_engine import Node, Path, NODE_TYPES, BoundsCache, GENERATION_KEY, sidebearing_proportion, fit_sidebearings
+from multi_line_profile import NULL_PROFILER
+
+# Glyphs generated before a chunk is written to the font, smaller chunks show progress sooner
+CHUNK_SIZE = 20
+
+# Chunks the worker thread may generate ahead of the commits on the main thread
+QUEUED_CHUNKS = 2
+
+
+def path_from_gspath(gspath):
+    """Convert a GSPath into the engine's plain path data"""
+    return Path.from_nodes([Node(node.position.x, node.position.y, node.type, node.smooth, dict(node.userData) if node.userData else None) for node in gspath.nodes], gspath.closed, dict(gspath.attributes))
+
+
+def gspath_from_path(path):
+    """Create a GSPath from the engine's plain path data, the only place GSNodes are made"""
+    gspath = GSPath()
+    coordinates = path.coordinates
+    node_data = path.node_data
+    for index, code in enumerate(path.types):
+        gsnode = GSNode((coordinates[2 * index], coordinates[2 * index + 1]), NODE_TYPES[code])
+        gsnode.smooth = bool(path.smooth[index])
+        if node_data and node_data[index]:
+            for key, value in node_data[index].items():
+                gsnode.userData[key] = value
+        gspath.nodes.append(gsnode)
+    gspath.closed = path.closed
+    for key, value in path.attributes.items():
+        gspath.attributes[key] = value
+    return gspath
+
+
+def layer_key(layer):
+    return (layer.parent.name, layer.layerId)
+
+
+def outline_bounds(layer, bounds_cache):
+    """
+    (xMin, yMin, xMax, yMax) of the drawn outlines of a layer, None if it is empty.
+    Stroked paths are measured analytically from their skeleton, only layers with
+    components fall back to the app's bounds, which expand every stroke.
+    """
+    key = layer_key(layer)
+    if key in bounds_cache.bounds:
+        return bounds_cache.bounds[key]
+    if layer.components:
+        bounds = layer.bounds
+        result = (bounds.origin.x, bounds.origin.y, bounds.origin.x + bounds.size.width, bounds.origin.y + bounds.size.height)
+        bounds_cache.bounds[key] = result
+        return result
+    return bounds_cache.get(key, [path_from_gspath(path) for path in layer.paths])
+
+
+class MetricsSync:
+    """
+    Syncs the width and sidebearing proportions of every layer to the first master,
+    once at the end of a run and only for the glyphs marked dirty.
+    Each layer is measured once, analytically for stroked paths, and moved with a
+    transform instead of the LSB/RSB setters, so no stroke is expanded to outlines.
+    Layers written by a FontTransaction are measured from the engine paths they were
+    made from, only the layers the run didn't touch are read back from their GSPaths.
+    """
+
+    def __init__(self, font, profiler=NULL_PROFILER):
+        self.font = font
+        self.dirty = {}
+        self.staged = {}
+        self.bounds_cache = BoundsCache()
+        self.profiler = profiler
+
+    def mark(self, glyph, layer_paths=None):
+        """`layer_paths` is {layerId: engine paths} of the written layers, as FontTransaction.commit returns it"""
+        self.dirty[glyph.name] = glyph
+        for layer_id, paths in (layer_paths or {}).items():
+            self.bounds_cache.invalidate((glyph.name, layer_id))
+            self.staged[(glyph.name, layer_id)] = paths
+
+    def layer_bounds(self, layer):
+        key = layer_key(layer)
+        with self.profiler.stage('bounds'):
+            if key in self.staged:
+                return self.bounds_cache.get(key, self.staged.pop(key))
+            return outline_bounds(layer, self.bounds_cache)
+
+    def fit_layer(self, layer, width, proportion):
+        bounds = self.layer_bounds(layer)
+        with self.profiler.stage('update_metrics'):
+            if bounds is not None:
+                shift = fit_sidebearings(bounds, width, proportion)
+                layer.applyTransform((1, 0, 0, 1, shift, 0))
+            layer.width = width
+            layer.updateMetrics()
+        self.bounds_cache.invalidate(layer_key(layer))
+
+    def sync_glyph(self, glyph):
+        first_master = glyph.layers[self.font.masters[0].id]
+        if not first_master:
+            print(f"No master layers found in {glyph.name}")
+            return
+        # Original spacing and glyph width are maintained across all layers
+        original_width = first_master.width
+        reference_bounds = self.layer_bounds(first_master)
+        if reference_bounds is None:
+            proportion = 0.5
+        else:
+            proportion = sidebearing_proportion(reference_bounds[0], original_width - reference_bounds[2])
+        for layer in glyph.layers:
+            if layer == first_master:
+                continue
+            self.fit_layer(layer, original_width, proportion)
+
+    def sync(self):
+        """Sync all dirty glyphs, returns how many were synced"""
+        count = len(self.dirty)
+        for glyph in self.dirty.values():
+            with self.profiler.glyph(glyph.name):
+                self.sync_glyph(glyph)
+        self.dirty.clear()
+        self.staged.clear()
+        self.bounds_cache.invalidate()
+        return count
+
+
+def delete_other_layers(glyph):
+    """Delete bracket and other non-master layers, in reverse order to avoid index issues"""
+    for layer_id in sorted([layer.layerId for layer in glyph.layers if not layer.isMasterLayer], reverse=True):
+        del glyph.layers[layer_id]
+
+
+def clear_paths(layer):
+    """Remove all paths of a layer in one assignment, components stay"""
+    shapes = layer.shapes
+    kept = [shape for shape in shapes if not isinstance(shape, GSPath)]
+    if len(kept) != len(shapes):
+        layer.shapes = kept
+
+
+def reset_glyph(glyph, master_ids, paths=True, other_layers=False):
+    """
+    The one place layer contents are taken out of a glyph, for reset, commit and rollback.
+    With `other_layers` bracket and other non-master layers are deleted, with `paths` the
+    master layers lose their paths. Components, anchors and hints always stay, a GlyphSnapshot
+    only holds what is taken out here and what its caller assigns.
+    """
+    if other_layers:
+        delete_other_layers(glyph)
+    if paths:
+        for master_id in master_ids:
+            clear_paths(glyph.layers[master_id])
+
+
+def target_glyphs(font, patterns=None):
+    """Glyphs matching the name patterns, or without patterns the selected glyphs, each once in order"""
+    if patterns:
+        return [glyph for glyph in font.glyphs if any(fnmatch.fnmatchcase(glyph.name, pattern) for pattern in patterns)]
+    glyphs = {}
+    for layer in font.selectedLayers or []:
+        glyph = layer.parent
+        if glyph is not None and glyph.name not in glyphs:
+            glyphs[glyph.name] = glyph
+    return list(glyphs.values())
+
+
+class StagedGlyph:
+    """Generated layers of one glyph, built in memory and not yet written to the font"""
+    __slots__ = ('glyph', 'master_paths', 'bracket_layers', 'width', 'key')
+
+    def __init__(self, glyph, master_paths, bracket_layers, width, key=None):
+        self.glyph = glyph
+        self.master_paths = master_paths
+        self.bracket_layers = bracket_layers
+        self.width = width
+        self.key = key
+
+
+class GlyphSnapshot:
+    """
+    What commit() or reset() replaces in a glyph, enough to put it back.
+    Without `copy` the snapshot keeps the shapes and layers themselves, for changes that
+    only take them out of the glyph and leave them untouched.
+    """
+
+    def __init__(self, glyph, master_ids, copy=True):
+        self.glyph = glyph
+        self.masters = {}
+        for master_id in master_ids:
+            layer = glyph.layers[master_id]
+            if copy:
+                self.masters[master_id] = ([shape.copy() for shape in layer.shapes], [anchor.copy() for anchor in layer.anchors], layer.width)
+            else:
+                self.masters[master_id] = (list(layer.shapes), list(layer.anchors), layer.width)
+        self.other_layers = [layer.copy() if copy else layer for layer in glyph.layers if not layer.isMasterLayer]
+        self.key = glyph.userData[GENERATION_KEY]
+
+    def restore(self):
+        glyph = self.glyph
+        reset_glyph(glyph, self.masters, paths=False, other_layers=True)
+        # Shapes and anchors are assigned as a whole, hints and other layer contents stay
+        for master_id, (shapes, anchors, width) in self.masters.items():
+            layer = glyph.layers[master_id]
+            layer.shapes = shapes
+            layer.anchors = anchors
+            layer.width = width
+        for layer in self.other_layers:
+            glyph.layers.append(layer)
+        if self.key is None:
+            del glyph.userData[GENERATION_KEY]
+        else:
+            glyph.userData[GENERATION_KEY] = self.key
+
+
+class FontTransaction:
+    """
+    Writes staged glyphs to the font as one transaction:
+
+        with FontTransaction(font) as transaction:
+            transaction.commit(staged_glyph)
+
+    Interface updates stay disabled for the whole run. Glyphs keeps undo per glyph, so
+    every touched glyph gets exactly one undo group, open until the transaction ends.
+    If an exception escapes the block, every committed glyph is restored from its
+    snapshot before the exception is passed on.
+    """
+
+    def __init__(self, font, profiler=NULL_PROFILER):
+        self.font = font
+        self.snapshots = []
+        self.open_glyphs = {}
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.font.disableUpdateInterface()
+        return self
+
+    def begin_glyph(self, glyph):
+        """Open the glyph's undo group, once per transaction"""
+        if glyph.name not in self.open_glyphs:
+            glyph.beginUndo()
+            self.open_glyphs[glyph.name] = glyph
+
+    def commit(self, staged):
+        """Write a StagedGlyph, returns {layerId: engine paths} of the layers it wrote for MetricsSync.mark"""
+        with self.profiler.glyph(staged.glyph.name):
+            with self.profiler.stage('snapshot'):
+                masters = self.font.masters[:len(staged.master_paths)]
+                self.begin_glyph(staged.glyph)
+                self.snapshots.append(GlyphSnapshot(staged.glyph, [master.id for master in masters]))
+            with self.profiler.stage('commit'):
+                return self.write(staged, masters)
+
+    def write(self, staged, masters):
+        glyph = staged.glyph
+        reset_glyph(glyph, [master.id for master in masters], paths=False, other_layers=True)
+        layer_paths = {}
+
+        # Replace the master shapes in one assignment per layer, anchors and hints stay
+        for master, paths in zip(masters, staged.master_paths):
+            layer = glyph.layers[master.id]
+            layer.shapes = [gspath_from_path(path) for path in paths]
+            layer_paths[master.id] = paths
+
+        for master, bracket in zip(masters, staged.bracket_layers):
+            if bracket is None:
+                continue
+            axis_rules, paths = bracket
+            bracket_layer = GSLayer()
+            bracket_layer.associatedMasterId = master.id
+            bracket_layer.attributes["axisRules"] = axis_rules
+            bracket_layer.shapes = [gspath_from_path(path) for path in paths]
+            bracket_layer.width = staged.width
+            glyph.layers.append(bracket_layer)
+            layer_paths[bracket_layer.layerId] = paths
+
+        if staged.key is not None:
+            glyph.userData[GENERATION_KEY] = staged.key
+        return layer_paths
+
+    def reset(self, glyph, masters=None, paths=True, other_layers=False):
+        """
+        Remove the paths of the master layers (components stay) and with `other_layers`
+        delete bracket and other non-master layers, one assignment per layer.
+        """
+        masters = self.font.masters if masters is None else masters
+        with self.profiler.glyph(glyph.name):
+            with self.profiler.stage('snapshot'):
+                self.begin_glyph(glyph)
+                self.snapshots.append(GlyphSnapshot(glyph, [master.id for master in masters], copy=False))
+            with self.profiler.stage('reset'):
+                reset_glyph(glyph, [master.id for master in masters], paths, other_layers)
+
+    def rollback(self):
+        for snapshot in reversed(self.snapshots):
+            snapshot.restore()
+        count = len(self.snapshots)
+        self.snapshots = []
+        return count
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is not None:
+                count = self.rollback()
+                print(f"Error: {exc_value}, restored {count} glyphs")
+        finally:
+            for glyph in self.open_glyphs.values():
+                glyph.endUndo()
+            self.open_glyphs = {}
+            self.font.enableUpdateInterface()
+        return False
+
+
+def font_designspace(font):
+    """multi_line_build.Designspace of a GSFont, for check_glyph"""
+    from multi_line_build import Designspace
+
+    disabled = []
+    for instance in font.instances:
+        if instance.type == INSTANCETYPEVARIABLE:
+            disabled.extend(instance.customParameters["Disable Masters"] or [])
+    return Designspace({
+        'axes': [{'name': axis.name, 'tag': axis.axisTag} for axis in font.axes],
+        'fontMaster': [{'name': master.name, 'axesValues': list(master.axes)} for master in font.masters],
+        'instances': [{'type': 'variable', 'customParameters': [{'name': 'Disable Masters', 'value': disabled}]}],
+    })
+
+
+def interpolation_layers(font, glyph, master_count=None):
+    """(master_layers, bracket_layers) of a glyph as multi_line_compat.check_glyph takes them"""
+    masters = font.masters[:master_count] if master_count else font.masters
+    master_ids = [master.id for master in masters]
+    master_layers = [(master.name, [path_from_gspath(path) for path in glyph.layers[master.id].paths]) for master in masters]
+    bracket_layers = []
+    for layer in glyph.layers:
+        if layer.isMasterLayer or layer.associatedMasterId not in master_ids or "axisRules" not in layer.attributes:
+            continue
+        bracket_layers.append((master_ids.index(layer.associatedMasterId), layer.attributes["axisRules"], layer.name or f"{masters[master_ids.index(layer.associatedMasterId)].name} bracket", [path_from_gspath(path) for path in layer.paths]))
+    return master_layers, bracket_layers
+
+
+class ChunkedRun:
+    """
+    Runs `generate(job)` over `jobs` in chunks of `chunk_size` and hands the results of every
+    chunk (None results left out) to `commit_chunk(results, done)` on the main thread, `done`
+    being the number of jobs finished so far. `finish(cancelled, error)` follows on the main
+    thread, `error` being None or (job, exception) of the failure that ended the run, the job
+    None if a commit failed. Nothing here prints, the worker thread must not touch the interface.
+
+    With `in_background` the generation runs on a worker thread that never touches the font,
+    only the commits are queued to the main thread, at most QUEUED_CHUNKS ahead of them.
+    Otherwise every chunk is one main thread call, so the interface still gets to update and
+    take a Cancel click between chunks. `call_on_main(function, *args)` queues a call on the
+    main thread (callAfter in the app), without it everything runs synchronously.
+
+    cancel() stops before the next glyph. Committed chunks stay, a generated chunk that is
+    not committed yet is dropped. A failing glyph ends the generation, but the chunks
+    generated before it are still committed. A chunk whose commit fails is rolled back by its
+    FontTransaction and ends the run, later chunks are dropped.
+    """
+
+    def __init__(self, jobs, generate, commit_chunk, finish, chunk_size=CHUNK_SIZE, call_on_main=None, in_background=True):
+        size = max(1, int(chunk_size))
+        self.chunks = [jobs[start:start + size] for start in range(0, len(jobs), size)]
+        self.generate = generate
+        self.commit_chunk = commit_chunk
+        self.finish = finish
+        self.call_on_main = call_on_main
+        self.in_background = in_background
+        # Set by cancel() only, errors end the run through `failed`
+        self.cancelled = threading.Event()
+        self.failed = threading.Event()
+        self.commit_failed = False
+        self.error = None
+        self.done = 0
+        self.thread = None
+        self.queued = threading.Semaphore(QUEUED_CHUNKS)
+
+    def start(self):
+        if self.call_on_main is None:
+            self.call_on_main = lambda function, *args: function(*args)
+            self._generate_all()
+        elif self.in_background:
+            self.thread = threading.Thread(target=self._generate_all, daemon=True)
+            self.thread.start()
+        else:
+            self.call_on_main(self._step, 0)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _generate_chunk(self, chunk):
+        """Results of one chunk, None if the run was cancelled on the way"""
+        results = []
+        for job in chunk:
+            if self.cancelled.is_set() or self.failed.is_set():
+                return None
+            try:
+                result = self.generate(job)
+            except Exception as e:
+                if self.error is None:
+                    self.error = (job, e)
+                self.failed.set()
+                raise
+            if result is not None:
+                results.append(result)
+        return results
+
+    def _generate_all(self):
+        finished = 0
+        try:
+            for chunk in self.chunks:
+                # Released by the commit of an earlier chunk, whether it lands or is dropped
+                self.queued.acquire()
+                results = self._generate_chunk(chunk)
+                if results is None:
+                    self.queued.release()
+                    break
+                finished += len(chunk)
+                self.call_on_main(self._commit_queued, results, finished)
+        except Exception:
+            self.queued.release()
+        finally:
+            # Queued after every commit, so the chunks generated before an error still land
+            self.call_on_main(self._finish)
+
+    def _step(self, number):
+        if number >= len(self.chunks) or self.cancelled.is_set() or self.failed.is_set():
+            self._finish()
+            return
+        try:
+            results = self._generate_chunk(self.chunks[number])
+        except Exception:
+            self._finish()
+            return
+        if results is not None:
+            self._commit(results, self.done + len(self.chunks[number]))
+        self.call_on_main(self._step, number + 1)
+
+    def _commit_queued(self, results, done):
+        try:
+            self._commit(results, done)
+        finally:
+            self.queued.release()
+
+    def _commit(self, results, done):
+        # Dropped after a cancel or a failed commit, not after a failed glyph
+        if self.cancelled.is_set() or self.commit_failed:
+            return
+        try:
+            self.commit_chunk(results, done)
+        except Exception as e:
+            # FontTransaction has restored the chunk
+            self.error = (None, e)
+            self.commit_failed = True
+            self.failed.set()
+        else:
+            self.done = done
+
+    def _finish(self):
+        self.finish(self.cancelled.is_set() and self.error is None, self.error)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Benchmarks the Multi Line Variable generation on synthetic fonts, without GlyphsApp.
+
+    python multi_line_benchmark.py --glyphs 10,100,500 --paths 2,8 -o bench.json --label 250523
+    python multi_line_benchmark.py --compare bench.json
+
+Every size runs the stages of process_glyphs against glyphsapp_stub (convert, key,
+generate, commit, sync), the reset of the generated font, the offset primitives on their
+own and the headless run on the equivalent .glyphs data, followed by a second headless run
+that has to skip every glyph. Times are the best of --repeat runs, peak memory comes from a
+separate tracemalloc pass so it does not distort the timings.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import glyphsapp_stub
+glyphsapp_stub.install()
+
+from GlyphsApp import GSFont, GSFontMaster, GSAxis, GSGlyph, GSPath, GSNode
+from multi_line_app import FontTransaction, MetricsSync, StagedGlyph, path_from_gspath
+from multi_line_engine import Node, Path, Settings, MASTER_COUNT, ENGINE_VERSION, calculate_diagonal_offset, generate_glyph, generation_key, offset_paths
+from multi_line_headless import process_font, shape_from_path
+
+STAGES = ('convert', 'key', 'generate', 'commit', 'sync', 'reset', 'diagonal_offset', 'offset', 'headless', 'rerun')
+
+# Relative slowdown of a stage reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+# --- Synthetic fonts ---
+
+def synthetic_path(rng):
+    """A stroked skeleton with line and curve segments, open or closed"""
+    x, y = rng.uniform(50, 150), rng.uniform(0, 100)
+    nodes = [Node(x, y, 'line')]
+    for _ in range(rng.randint(2, 5)):
+        next_x, next_y = x + rng.uniform(-40, 160), y + rng.uniform(-120, 160)
+        if rng.random() < 0.5:
+            nodes.append(Node(x + (next_x - x) / 3, y + (next_y - y) / 3 + rng.uniform(-30, 30), 'offcurve'))
+            nodes.append(Node(x + 2 * (next_x - x) / 3, y + 2 * (next_y - y) / 3 + rng.uniform(-30, 30), 'offcurve'))
+            nodes.append(Node(next_x, next_y, 'curve', rng.random() < 0.5))
+        else:
+            nodes.append(Node(next_x, next_y, 'line'))
+        x, y = next_x, next_y
+    closed = rng.random() < 0.2
+    if closed and nodes[-1].type == 'curve':
+        nodes.append(Node(nodes[0].x, nodes[0].y + 1, 'line'))
+    attributes = {'strokeWidth': 10, 'strokeHeight': 10}
+    if rng.random() < 0.65:
+        attributes['strokePos'] = "1"
+    return Path.from_nodes(nodes, closed, attributes)
+
+
+def synthetic_glyphs(glyph_count, paths_per_glyph, seed=0):
+    """[(name, width, [Path])], the same for a given seed"""
+    rng = random.Random(seed)
+    return [(f"g{index:05d}", 600, [synthetic_path(rng) for _ in range(paths_per_glyph)]) for index in range(glyph_count)]
+
+
+def master_names():
+    return [f"Master {index + 1}" for index in range(MASTER_COUNT)]
+
+
+def stub_font(glyphs):
+    font = GSFont()
+    font.masters = [GSFontMaster(name, f"M{index + 1}") for index, name in enumerate(master_names())]
+    font.axes = [GSAxis("Weight", "wght"), GSAxis("Offset", "OFST")]
+    for name, width, paths in glyphs:
+        glyph = GSGlyph(name)
+        font.addGlyph(glyph)
+        layer = glyph.layers[font.masters[0].id]
+        layer.width = width
+        for path in paths:
+            gspath = GSPath()
+            for node in path.nodes:
+                gsnode = GSNode((node.x, node.y), node.type)
+                gsnode.smooth = node.smooth
+                gspath.nodes.append(gsnode)
+            gspath.closed = path.closed
+            gspath.attributes = dict(path.attributes)
+            layer.shapes.append(gspath)
+        for master in font.masters[1:]:
+            glyph.layers[master.id].width = width
+    return font
+
+
+def plist_font(glyphs):
+    masters = [{'id': f"M{index + 1}", 'name': name} for index, name in enumerate(master_names())]
+    font_glyphs = []
+    for name, width, paths in glyphs:
+        layers = [{'layerId': masters[0]['id'], 'shapes': [shape_from_path(path) for path in paths], 'width': width}]
+        layers.extend({'layerId': master['id'], 'width': width} for master in masters[1:])
+        font_glyphs.append({'glyphname': name, 'layers': layers})
+    return {'axes': [{'name': "Weight", 'tag': "wght"}, {'name': "Offset", 'tag': "OFST"}], 'fontMaster': masters, 'glyphs': font_glyphs}
+
+
+# --- Stages ---
+
+class StageTimer:
+    """Wall time, and with tracemalloc running the peak allocation, per stage"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_bytes = {}
+        self.traced_peaks = {}
+
+    def run(self, stage, function, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function(*args)
+        self.seconds[stage] = time.perf_counter() - start
+        if self.trace_memory:
+            self.traced_peaks[stage] = tracemalloc.get_traced_memory()[1]
+            self.peak_bytes[stage] = self.traced_peaks[stage] - baseline
+        return result
+
+
+def run_stages(glyphs, settings, timer):
+    """The steps of process_glyphs in order, the reset, plus the offset primitives and the headless runs"""
+    font = stub_font(glyphs)
+    master1 = font.masters[0]
+    key_context = [(master.id, master.name) for master in font.masters] + [axis.axisTag for axis in font.axes]
+
+    originals = timer.run('convert', lambda: [(glyph, [path_from_gspath(path) for path in glyph.layers[master1.id].paths]) for glyph in font.glyphs])
+    keys = timer.run('key', lambda: [generation_key(paths, glyph.layers[master1.id].width, settings, key_context) for glyph, paths in originals])
+
+    def generate():
+        return [StagedGlyph(glyph, *generate_glyph(paths, settings), glyph.layers[master1.id].width, key) for (glyph, paths), key in zip(originals, keys)]
+    staged_glyphs = timer.run('generate', generate)
+
+    metrics = MetricsSync(font)
+    def commit():
+        with FontTransaction(font) as transaction:
+            for staged in staged_glyphs:
+                metrics.mark(staged.glyph, transaction.commit(staged))
+    timer.run('commit', commit)
+    timer.run('sync', metrics.sync)
+    check_up_to_date([glyph.name for glyph, key in zip(font.glyphs, keys) if generation_key([path_from_gspath(path) for path in glyph.layers[master1.id].paths], glyph.layers[master1.id].width, settings, key_context) != key])
+
+    def reset():
+        with FontTransaction(font) as transaction:
+            for glyph in font.glyphs:
+                transaction.reset(glyph, font.masters, other_layers=True)
+    timer.run('reset', reset)
+
+    all_paths = [path for _, paths in originals for path in paths]
+    timer.run('diagonal_offset', lambda: [calculate_diagonal_offset(path, settings.original_offset) for path in all_paths])
+    timer.run('offset', offset_paths, [(path, settings.original_offset, settings.original_offset) for path in all_paths])
+
+    headless_font = plist_font(glyphs)
+    timer.run('headless', process_font, headless_font, settings, None, 1, None, True)
+    check_up_to_date(timer.run('rerun', process_font, headless_font, settings)['generated'])
+
+
+def check_up_to_date(names):
+    """Generated glyphs have to keep the generation key of their source, or every run regenerates them"""
+    if names:
+        raise RuntimeError(f"{len(names)} generated glyphs would be regenerated by the next run, e.g. {', '.join(names[:5])}")
+
+
+def benchmark_size(glyph_count, paths_per_glyph, settings, repeat=3, seed=0):
+    glyphs = synthetic_glyphs(glyph_count, paths_per_glyph, seed)
+    path_count = glyph_count * paths_per_glyph
+    best = {}
+    for _ in range(repeat):
+        timer = StageTimer()
+        run_stages(glyphs, settings, timer)
+        for stage, seconds in timer.seconds.items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+
+    tracemalloc.start()
+    try:
+        memory = StageTimer(trace_memory=True)
+        run_stages(glyphs, settings, memory)
+    finally:
+        tracemalloc.stop()
+
+    stages = {}
+    for stage in STAGES:
+        seconds = best[stage]
+        stages[stage] = {
+            'seconds': seconds,
+            'glyphs_per_second': glyph_count / seconds if seconds else None,
+            'paths_per_second': path_count / seconds if seconds else None,
+            'peak_bytes': memory.peak_bytes[stage],
+        }
+    pipeline_stages = ('convert', 'key', 'generate', 'commit', 'sync')
+    pipeline = sum(best[stage] for stage in pipeline_stages)
+    return {
+        'glyphs': glyph_count,
+        'paths_per_glyph': paths_per_glyph,
+        'nodes': sum(path.node_count for _, _, paths in glyphs for path in paths),
+        'stages': stages,
+        'pipeline': {
+            'seconds': pipeline,
+            'glyphs_per_second': glyph_count / pipeline if pipeline else None,
+            'paths_per_second': path_count / pipeline if pipeline else None,
+            'peak_bytes': max(memory.traced_peaks[stage] for stage in pipeline_stages),
+        },
+    }
+
+
+# --- Reporting ---
+
+def print_result(result):
+    print(f"{result['glyphs']} glyphs x {result['paths_per_glyph']} paths ({result['nodes']} nodes)")
+    rows = list(result['stages'].items()) + [('pipeline', result['pipeline'])]
+    for stage, numbers in rows:
+        print(f"  {stage:<16}{numbers['seconds'] * 1000:>10.1f} ms{numbers['glyphs_per_second'] or 0:>12.0f} glyphs/s{numbers['paths_per_second'] or 0:>12.0f} paths/s{numbers['peak_bytes'] / 1024:>10.0f} KiB")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print the time ratio of every stage against a baseline, returns the regressions"""
+    previous = {(item['glyphs'], item['paths_per_glyph']): item for item in baseline.get('results', [])}
+    regressions = []
+    print(f"Compared with {baseline.get('label')} (engine {baseline.get('engine_version')})")
+    for result in results:
+        size = (result['glyphs'], result['paths_per_glyph'])
+        if size not in previous:
+            continue
+        for stage, numbers in list(result['stages'].items()) + [('pipeline', result['pipeline'])]:
+            old = previous[size]['pipeline'] if stage == 'pipeline' else previous[size]['stages'].get(stage)
+            if not old or not old['seconds']:
+                continue
+            ratio = numbers['seconds'] / old['seconds']
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append((size, stage, ratio))
+            print(f"  {size[0]}x{size[1]} {stage:<16}{ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def number_list(text):
+    return [int(item) for item in text.split(',') if item.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the Multi Line Variable generation on synthetic fonts")
+    parser.add_argument('--glyphs', type=number_list, default=[10, 100, 500], help="comma separated glyph counts (default: 10,100,500)")
+    parser.add_argument('--paths', type=number_list, default=[2, 8], help="comma separated paths per glyph (default: 2,8)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size, the fastest counts (default: 3)")
+    parser.add_argument('--lines', type=int, default=2, help="parallel lines per stroke (default: 2)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic fonts")
+    parser.add_argument('--label', default=f"engine-{ENGINE_VERSION}", help="name of this run in the results, e.g. the script version")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="relative slowdown reported as a regression (default: 0.10)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = Settings(line_count=max(1, args.lines))
+    results = []
+    for glyph_count in args.glyphs:
+        for paths_per_glyph in args.paths:
+            result = benchmark_size(glyph_count, paths_per_glyph, settings, max(1, args.repeat), args.seed)
+            print_result(result)
+            results.append(result)
+
+    report = {
+        'label': args.label,
+        'engine_version': ENGINE_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'lines': settings.line_count,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
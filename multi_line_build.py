@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Compiles a generated .glyphs file into a variable TTF without GlyphsApp, using fontTools.
+
+    python multi_line_build.py output.glyphs -o MultiLine-VF.ttf --cache build-cache.json
+
+Strokes are expanded to outlines by the engine, converted to compatible quadratic curves
+and turned into gvar deltas glyph by glyph. The compiled outlines and deltas of every glyph
+are cached under a hash of its layers and the designspace, so a rebuild after changing a
+few glyphs only compiles those and reassembles the font from the cache.
+
+Masters switched off with "Disable Masters" on the variable instance are left out, the first
+remaining master is the default. Every group of bracket layers becomes an alternate glyph
+'name.BRACKET.varAltNN', swapped in by the rvrn feature within its axis rules.
+Only the outlines vary, advance widths come from the default master. Components are
+decomposed through the same master or bracket layer of their base glyph.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from array import array
+
+import glyphs_plist
+from multi_line_compat import rules_key, structure
+from multi_line_engine import Path, stroke_outline, reverse_contour, contour_area, segments
+from multi_line_headless import path_from_shape, is_path
+
+try:
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.cu2quPen import Cu2QuMultiPen
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.ttLib.tables import ttProgram
+    from fontTools.ttLib.tables._g_l_y_f import Glyph, GlyphCoordinates
+    from fontTools.ttLib.tables.TupleVariation import TupleVariation
+    from fontTools.varLib.featureVars import addFeatureVariations
+    from fontTools.varLib.models import VariationModel
+except ImportError:
+    FontBuilder = None
+
+# Stored with the build cache, entries of other versions are recompiled
+BUILD_VERSION = 2
+
+# Maximum distance of the quadratic curves from the cubic ones, in units per em
+MAX_ERROR = 1.0
+
+# gvar deltas also cover the four phantom points after the outline points
+PHANTOM_POINTS = 4
+
+
+# --- Designspace ---
+
+def normalize_value(value, axis_range):
+    """Axis value in -1..1 around the default of (minimum, default, maximum), like fontTools' normalizeValue"""
+    lower, default, upper = axis_range
+    value = max(min(value, upper), lower)
+    if value == default or lower == upper:
+        return 0.0
+    if value < default:
+        return (value - default) / (default - lower)
+    return (value - default) / (upper - default)
+
+
+class Designspace:
+    """
+    Axes, exported masters and their normalized locations of a .glyphs font.
+    Needs no fontTools, so the compatibility check reads the same designspace as the build.
+    """
+
+    def __init__(self, font):
+        self.axes = [(axis.get('tag', axis['name'][:4].upper()), axis['name']) for axis in font.get('axes', [])]
+        masters = font.get('fontMaster', [])
+        disabled = set()
+        for instance in font.get('instances', []):
+            if instance.get('type') == 'variable':
+                for parameter in instance.get('customParameters', []):
+                    if parameter.get('name') == 'Disable Masters':
+                        disabled.update(parameter.get('value', []))
+        # Indices into font['fontMaster'], the first one is the default
+        self.masters = [index for index, master in enumerate(masters) if master.get('name') not in disabled]
+        if not self.masters:
+            self.masters = list(range(len(masters)))
+        values = [list(masters[index].get('axesValues', [])) for index in self.masters]
+        values = [row + [0] * (len(self.axes) - len(row)) for row in values]
+        self.ranges = []
+        for axis_index in range(len(self.axes)):
+            column = [row[axis_index] for row in values]
+            self.ranges.append((min(column), values[0][axis_index], max(column)))
+        self.locations = [{tag: normalize_value(row[axis_index], self.ranges[axis_index]) for axis_index, (tag, _) in enumerate(self.axes)} for row in values]
+
+    def box(self, key):
+        """Normalized {tag: (lower, upper)} region of an axis rules key, None if it is empty"""
+        box = {}
+        for axis, rule in key:
+            if isinstance(axis, str):
+                axis = int(axis[1:]) - 1
+            if axis >= len(self.axes):
+                continue
+            rule = dict(rule)
+            lower, default, upper = self.ranges[axis]
+            minimum = max(lower, rule.get('min', lower))
+            maximum = min(upper, rule.get('max', upper))
+            if minimum > maximum:
+                return None
+            box[self.axes[axis][0]] = (normalize_value(minimum, self.ranges[axis]), normalize_value(maximum, self.ranges[axis]))
+        if not box:
+            # Rules covering the whole designspace
+            tag, _ = self.axes[0]
+            box[tag] = (normalize_value(self.ranges[0][0], self.ranges[0]), normalize_value(self.ranges[0][2], self.ranges[0]))
+        return box
+
+    def covers(self, box):
+        """True if a box from box() spans the whole range of every axis it restricts"""
+        for (tag, _), axis_range in zip(self.axes, self.ranges):
+            if tag in box and box[tag] != (normalize_value(axis_range[0], axis_range), normalize_value(axis_range[2], axis_range)):
+                return False
+        return True
+
+    def signature(self):
+        """Everything compiled glyphs depend on, master locations included"""
+        return [self.axes, self.masters, self.ranges, [sorted(location.items()) for location in self.locations]]
+
+
+# --- Outlines ---
+
+def outline_contours(paths):
+    """
+    Filled contours of a layer, one list per source path that draws anything.
+    """
+    return [contours for contours in (stroke_outline(path) for path in paths) if contours]
+
+
+def oriented_contours(master_groups):
+    """
+    Flat contour list of every master. A path's contours are reversed in all masters when
+    its first contour runs counter-clockwise in the default master, TrueType fills clockwise.
+    """
+    reference = master_groups[0]
+    flags = [len(contours) > 0 and contour_area(contours[0]) > 0 for contours in reference]
+    result = []
+    for groups in master_groups:
+        contours = []
+        for group, reverse in zip(groups, flags):
+            contours.extend(reverse_contour(contour) if reverse else contour for contour in group)
+        result.append(contours)
+    return result
+
+
+def draw_contours(pen, contours_per_master):
+    """Draw the same contours of all masters at once into a Cu2QuMultiPen"""
+    for contours in zip(*contours_per_master):
+        master_segments = [list(segments(contour)) for contour in contours]
+        codes = [code for code in contours[0].types if code != 'o']
+        pen.moveTo([(segment_list[-1][-1],) for segment_list in master_segments])
+        for number, code in enumerate(codes):
+            points = [tuple(segment_list[number][1:]) for segment_list in master_segments]
+            if len(points[0]) == 1:
+                pen.lineTo(points)
+            elif code == 'q':
+                pen.qCurveTo(points)
+            else:
+                pen.curveTo(points)
+        pen.closePath()
+
+
+def _glyph_data(glyph):
+    if glyph.numberOfContours == 0:
+        return {'coordinates': [], 'ends': [], 'flags': []}
+    return {
+        'coordinates': [list(point) for point in glyph.coordinates],
+        'ends': list(glyph.endPtsOfContours),
+        'flags': list(glyph.flags),
+    }
+
+
+def compile_glyph(groups, designspace, max_error=MAX_ERROR):
+    """
+    Outline and variations of one output glyph from the contour groups of every exported master.
+    Returns the artifact stored in the cache: {'outline', 'variations', 'static'}.
+    Masters that do not interpolate give a static glyph from the default master.
+    """
+    contours = oriented_contours(groups)
+    compatible = len(set(len(group) for group in groups)) == 1 and len(set(structure(master_contours) for master_contours in contours)) == 1
+    if not compatible:
+        contours = contours[:1]
+    pens = [TTGlyphPen(None) for _ in contours]
+    draw_contours(Cu2QuMultiPen(pens, max_error), contours)
+    glyphs = [pen.glyph() for pen in pens]
+    artifact = {'outline': _glyph_data(glyphs[0]), 'variations': [], 'static': not compatible}
+    if not compatible or glyphs[0].numberOfContours == 0:
+        return artifact
+
+    tags = [tag for tag, _ in designspace.axes]
+    model = VariationModel(designspace.locations, axisOrder=tags)
+    master_coordinates = [GlyphCoordinates(list(glyph.coordinates) + [(0, 0)] * PHANTOM_POINTS) for glyph in glyphs]
+    deltas, supports = model.getDeltasAndSupports(master_coordinates)
+    for delta, support in zip(deltas[1:], supports[1:]):
+        points = [[round(x), round(y)] for x, y in delta]
+        if any(x or y for x, y in points):
+            artifact['variations'].append({'support': {tag: list(region) for tag, region in support.items()}, 'deltas': points})
+    return artifact
+
+
+# --- Glyphs ---
+
+def transform_contour(contour, transform):
+    """Copy of a contour moved by an affine (xx, xy, yx, yy, dx, dy) transform"""
+    xx, xy, yx, yy, dx, dy = transform
+    coordinates = contour.coordinates
+    moved = array('d')
+    for index in range(0, len(coordinates), 2):
+        x = coordinates[index]
+        y = coordinates[index + 1]
+        moved.append(xx * x + yx * y + dx)
+        moved.append(xy * x + yy * y + dy)
+    return Path(moved, contour.types, contour.smooth, contour.closed, dict(contour.attributes))
+
+
+def component_transform(shape):
+    """Affine transform of a component shape: scaled, rotated, then moved to its position"""
+    if any(shape.get('slant', ())):
+        raise ValueError(f"slanted component {shape['ref']} is not supported")
+    x, y = shape.get('pos', (0, 0))
+    scale_x, scale_y = shape.get('scale', (1, 1))
+    angle = math.radians(shape.get('angle', 0))
+    cos, sin = math.cos(angle), math.sin(angle)
+    return (scale_x * cos, scale_x * sin, -scale_y * sin, scale_y * cos, x, y)
+
+
+def source_layer(glyph, master_id, key=None):
+    """Master layer of a glyph, or with an axis rules `key` its bracket layer of that master if it has one"""
+    master_layer = None
+    for layer in glyph.get('layers', []):
+        attributes = layer.get('attr', {})
+        if key is not None and layer.get('associatedMasterId') == master_id and 'axisRules' in attributes and rules_key(attributes['axisRules']) == key:
+            return layer
+        if layer.get('layerId') == master_id and 'associatedMasterId' not in layer:
+            master_layer = layer
+    return master_layer
+
+
+def component_names(glyph):
+    """Base glyphs the layers of a glyph refer to"""
+    return {shape['ref'] for layer in glyph.get('layers', []) for shape in layer.get('shapes', []) if 'ref' in shape}
+
+
+def layer_contours(glyphs, glyph, master_id, key=None, parents=()):
+    """
+    Contour groups of a glyph's layer, one per path that draws anything. Components draw the
+    same layer of their base glyph, master or bracket, through their transform.
+    Raises ValueError naming the glyph if a component can't be decomposed.
+    """
+    name = glyph['glyphname']
+    layer = source_layer(glyph, master_id, key)
+    if layer is None:
+        raise ValueError(f"{parents[-1]} uses {name}, which has no master layer {master_id}")
+    shapes = layer.get('shapes', [])
+    groups = outline_contours([path_from_shape(shape) for shape in shapes if is_path(shape)])
+    for shape in shapes:
+        if 'ref' not in shape:
+            continue
+        base = glyphs.get(shape['ref'])
+        if base is None:
+            raise ValueError(f"{name} has a component of missing glyph {shape['ref']}")
+        if shape['ref'] in parents + (name,):
+            raise ValueError(f"{name} has a component of {shape['ref']}, which contains {name}")
+        try:
+            transform = component_transform(shape)
+        except ValueError as error:
+            raise ValueError(f"{name} has a {error}")
+        for group in layer_contours(glyphs, base, master_id, key, parents + (name,)):
+            groups.append([transform_contour(contour, transform) for contour in group])
+    return groups
+
+
+def bracket_keys(glyphs, glyph, master_ids, parents=()):
+    """Axis rules keys of the bracket layers of a glyph and its base glyphs, in order of appearance"""
+    keys = {}
+    for layer in glyph.get('layers', []):
+        attributes = layer.get('attr', {})
+        if layer.get('associatedMasterId') in master_ids and 'axisRules' in attributes:
+            keys.setdefault(rules_key(attributes['axisRules']), None)
+    for name in sorted(component_names(glyph)):
+        if name in glyphs and name not in parents:
+            for key in bracket_keys(glyphs, glyphs[name], master_ids, parents + (glyph['glyphname'],)):
+                keys.setdefault(key, None)
+    return list(keys)
+
+
+def output_layers(font, glyph, designspace, glyphs=None):
+    """
+    [(suffix, axis rules key, [contour groups per exported master])] of a glyph: the master
+    layers, then one entry per bracket group of the glyph or its components, with the master
+    layers standing in for missing brackets. `glyphs` is {name: glyph} of the font.
+    None if a master layer is missing, ValueError if a component can't be decomposed.
+    """
+    if glyphs is None:
+        glyphs = {item['glyphname']: item for item in font.get('glyphs', [])}
+    ids = [font['fontMaster'][index]['id'] for index in designspace.masters]
+    if any(source_layer(glyph, master_id) is None for master_id in ids):
+        return None
+    result = [('', None, [layer_contours(glyphs, glyph, master_id) for master_id in ids])]
+    for number, key in enumerate(bracket_keys(glyphs, glyph, ids)):
+        result.append((f".BRACKET.varAlt{number + 1:02d}", key, [layer_contours(glyphs, glyph, master_id, key) for master_id in ids]))
+    return result
+
+
+def build_key(font, glyph, designspace, max_error, glyphs=None, parents=()):
+    """Hash of everything the compiled glyph depends on, the glyphs its components use included"""
+    if glyphs is None:
+        glyphs = {item['glyphname']: item for item in font.get('glyphs', [])}
+    ids = [font['fontMaster'][index]['id'] for index in designspace.masters]
+    layers = [layer for layer in glyph.get('layers', []) if layer.get('layerId') in ids or layer.get('associatedMasterId') in ids]
+    content = [{'id': layer.get('layerId'), 'master': layer.get('associatedMasterId'), 'attr': layer.get('attr', {}), 'shapes': layer.get('shapes', []), 'width': layer.get('width', 0)} for layer in layers]
+    digest = hashlib.sha1()
+    digest.update(json.dumps([BUILD_VERSION, max_error, designspace.signature()]).encode('utf-8'))
+    digest.update(glyphs_plist.dumps(content).encode('utf-8'))
+    for name in sorted(component_names(glyph)):
+        base = glyphs.get(name)
+        if base is not None and name not in parents:
+            digest.update(f"\n{name}:{build_key(font, base, designspace, max_error, glyphs, parents + (glyph['glyphname'],))}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def default_width(font, glyph, designspace):
+    master_id = font['fontMaster'][designspace.masters[0]]['id']
+    for layer in glyph.get('layers', []):
+        if layer.get('layerId') == master_id:
+            return layer.get('width', 0)
+    return 0
+
+
+def compile_glyph_entry(font, glyph, designspace, max_error, glyphs=None):
+    """
+    Cache entry of a source glyph: its output glyphs and the axis rules of the alternates.
+    None if a master layer is missing, ValueError if a component can't be decomposed.
+    """
+    entry = {'width': default_width(font, glyph, designspace), 'glyphs': {}, 'rules': []}
+    layers = output_layers(font, glyph, designspace, glyphs)
+    if layers is None:
+        return None
+    for suffix, key, groups in layers:
+        name = glyph['glyphname'] + suffix
+        entry['glyphs'][name] = compile_glyph(groups, designspace, max_error)
+        if key is not None:
+            box = designspace.box(key)
+            entry['rules'].append([[[tag, list(region)] for tag, region in box.items()] if box else None, name])
+    return entry
+
+
+class BuildCache:
+    """Compiled glyphs of earlier builds, keyed by glyph name and build key"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.entries = {}
+        self.changed = False
+        if file_path and os.path.exists(file_path):
+            try:
+                with open(file_path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable build cache {file_path}: {e}")
+                data = {}
+            if data.get('version') == BUILD_VERSION:
+                self.entries = data.get('glyphs', {})
+
+    def get(self, glyph_name, key):
+        entry = self.entries.get(glyph_name)
+        if entry is None or entry.get('key') != key:
+            return None
+        return entry['compiled']
+
+    def put(self, glyph_name, key, compiled):
+        self.entries[glyph_name] = {'key': key, 'compiled': compiled}
+        self.changed = True
+
+    def prune(self, glyph_names):
+        """Forget glyphs that are no longer in the font"""
+        for name in set(self.entries) - set(glyph_names):
+            del self.entries[name]
+            self.changed = True
+
+    def save(self):
+        if not self.file_path or not self.changed:
+            return
+        temp_path = self.file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': BUILD_VERSION, 'glyphs': self.entries}, f, sort_keys=True)
+        os.replace(temp_path, self.file_path)
+        self.changed = False
+
+
+# --- Font assembly ---
+
+def tt_glyph(outline):
+    glyph = Glyph()
+    if not outline['ends']:
+        glyph.numberOfContours = 0
+        return glyph
+    glyph.numberOfContours = len(outline['ends'])
+    glyph.coordinates = GlyphCoordinates([tuple(point) for point in outline['coordinates']])
+    glyph.endPtsOfContours = list(outline['ends'])
+    glyph.flags = bytearray(outline['flags'])
+    glyph.program = ttProgram.Program()
+    glyph.program.fromBytecode(b"")
+    return glyph
+
+
+def unicodes(glyph):
+    value = glyph.get('unicode')
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return [int(item, 16) if isinstance(item, str) else int(item) for item in values]
+
+
+def vertical_metrics(font, designspace):
+    """(ascender, descender) of the default master"""
+    master = font['fontMaster'][designspace.masters[0]]
+    metrics = {}
+    for metric, value in zip(font.get('metrics', []), master.get('metricValues', [])):
+        if 'type' in metric and 'pos' in value:
+            metrics.setdefault(metric['type'], value['pos'])
+    return metrics.get('ascender', 800), metrics.get('descender', -200)
+
+
+def feature_variations(compiled, order):
+    """(region, substitutions) per alternate glyph in glyph order, for addFeatureVariations"""
+    conditions = []
+    for name in order:
+        entry = compiled[name]
+        for box, alternate in entry['rules']:
+            if box is None:
+                continue
+            conditions.append(([{tag: tuple(region) for tag, region in box}], {name: alternate}))
+    return conditions
+
+
+def assemble_font(font, designspace, compiled, order):
+    """TTFont from the compiled entries of the glyphs in `order`"""
+    upm = font.get('unitsPerEm', 1000)
+    glyph_order = ['.notdef'] + order
+    for name in order:
+        glyph_order.extend(output for output in compiled[name]['glyphs'] if output != name)
+    glyphs = {'.notdef': tt_glyph({'ends': []})}
+    advances = {'.notdef': upm // 2}
+    variations = {}
+    cmap = {}
+    for glyph in font.get('glyphs', []):
+        name = glyph['glyphname']
+        if name in compiled:
+            for code in unicodes(glyph):
+                cmap[code] = name
+    for name in order:
+        entry = compiled[name]
+        for output, artifact in entry['glyphs'].items():
+            glyphs[output] = tt_glyph(artifact['outline'])
+            advances[output] = round(entry['width'])
+            if artifact['variations']:
+                variations[output] = [TupleVariation({tag: tuple(region) for tag, region in item['support'].items()}, [tuple(delta) for delta in item['deltas']]) for item in artifact['variations']]
+
+    builder = FontBuilder(upm, isTTF=True)
+    builder.setupGlyphOrder(glyph_order)
+    builder.setupCharacterMap(cmap)
+    builder.setupGlyf(glyphs)
+    glyf = builder.font['glyf']
+    builder.setupHorizontalMetrics({name: (advances[name], getattr(glyf[name], 'xMin', 0)) for name in glyph_order})
+    ascender, descender = vertical_metrics(font, designspace)
+    builder.setupHorizontalHeader(ascent=ascender, descent=descender)
+    family = font.get('familyName', "Multi Line")
+    builder.setupNameTable({
+        'familyName': family,
+        'styleName': "Regular",
+        'uniqueFontIdentifier': f"{family} Variable",
+        'fullName': f"{family} Variable",
+        'psName': family.replace(' ', '') + "-Variable",
+        'version': f"Version {font.get('versionMajor', 1)}.{font.get('versionMinor', 0):03d}",
+    })
+    builder.setupOS2(sTypoAscender=ascender, sTypoDescender=descender, usWinAscent=ascender, usWinDescent=-descender)
+    builder.setupPost()
+    builder.setupFvar([(tag, minimum, default, maximum, name) for (tag, name), (minimum, default, maximum) in zip(designspace.axes, designspace.ranges)], [])
+    builder.setupGvar(variations)
+    conditions = feature_variations(compiled, order)
+    if conditions:
+        addFeatureVariations(builder.font, conditions)
+    return builder.font
+
+
+def build_font(font, cache=None, max_error=MAX_ERROR):
+    """
+    Compile a .glyphs font dict into a variable TTFont.
+    Returns (ttfont, {'compiled', 'cached', 'static', 'missing', 'failed'}) with glyph names,
+    'failed' holding (name, reason) of glyphs whose components can't be decomposed.
+    """
+    designspace = Designspace(font)
+    glyphs = {glyph['glyphname']: glyph for glyph in font.get('glyphs', [])}
+    result = {'compiled': [], 'cached': [], 'static': [], 'missing': [], 'failed': []}
+    compiled = {}
+    order = []
+    for glyph in font.get('glyphs', []):
+        if glyph.get('export', 1) == 0:
+            continue
+        name = glyph['glyphname']
+        key = build_key(font, glyph, designspace, max_error, glyphs)
+        entry = cache.get(name, key) if cache is not None else None
+        if entry is not None:
+            result['cached'].append(name)
+        else:
+            try:
+                entry = compile_glyph_entry(font, glyph, designspace, max_error, glyphs)
+            except ValueError as error:
+                result['failed'].append((name, str(error)))
+                continue
+            if entry is None:
+                result['missing'].append(name)
+                continue
+            result['compiled'].append(name)
+            if cache is not None:
+                cache.put(name, key, entry)
+        if any(artifact['static'] for artifact in entry['glyphs'].values()):
+            result['static'].append(name)
+        compiled[name] = entry
+        order.append(name)
+    if cache is not None:
+        cache.prune(order)
+    return assemble_font(font, designspace, compiled, order), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a generated .glyphs file into a variable TTF")
+    parser.add_argument('source', help=".glyphs file")
+    parser.add_argument('-o', '--output', help="TTF file (default: source name with -VF.ttf)")
+    parser.add_argument('--cache', help="JSON file with the compiled glyphs of earlier builds")
+    parser.add_argument('--max-error', type=float, default=MAX_ERROR, help="maximum error of the quadratic conversion in units (default: 1.0)")
+    args = parser.parse_args(argv)
+    if FontBuilder is None:
+        print("fontTools is required to build fonts: pip install fonttools")
+        return 1
+
+    start = time.time()
+    font = glyphs_plist.load(args.source)
+    cache = BuildCache(args.cache) if args.cache else None
+    ttfont, result = build_font(font, cache, args.max_error)
+    output = args.output or os.path.splitext(args.source)[0] + "-VF.ttf"
+    ttfont.save(output)
+    if cache is not None:
+        cache.save()
+    for name in result['missing']:
+        print(f"Skipped {name}: missing master layer")
+    for name, reason in result['failed']:
+        print(f"Skipped {name}: {reason}")
+    if result['static']:
+        print(f"Not interpolating, exported static: {', '.join(result['static'])}")
+    print(f"Compiled {len(result['compiled'])}, cached {len(result['cached'])} glyphs into {output} in {time.time() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Persistent cache of generated glyph layers for headless runs.
+Entries are keyed by glyph name and store the generation key next to the
+layers serialized in .glyphs notation, so a hit can be restored without regenerating.
+"""
+
+import json
+import os
+
+import glyphs_plist
+from multi_line_engine import ENGINE_VERSION
+
+
+class GlyphCache:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.entries = {}
+        self.changed = False
+        if file_path and os.path.exists(file_path):
+            try:
+                with open(file_path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cache {file_path}: {e}")
+                data = {}
+            if data.get('version') == ENGINE_VERSION:
+                self.entries = data.get('glyphs', {})
+
+    def get(self, glyph_name, key):
+        """Cached layers of a glyph if they were generated with `key`, else None"""
+        entry = self.entries.get(glyph_name)
+        if entry is None or entry.get('key') != key:
+            return None
+        return glyphs_plist.loads(entry['layers'])
+
+    def put(self, glyph_name, key, layers):
+        self.entries[glyph_name] = {'key': key, 'layers': glyphs_plist.dumps(layers)}
+        self.changed = True
+
+    def save(self):
+        if not self.file_path or not self.changed:
+            return
+        temp_path = self.file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ENGINE_VERSION, 'glyphs': self.entries}, f, sort_keys=True)
+        os.replace(temp_path, self.file_path)
+        self.changed = False
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Interpolation compatibility check of generated glyphs, before exporting the variable font.
+
+    python multi_line_compat.py output.glyphs --glyphs "A,B,a*"
+
+Every set of layers that interpolates together is checked: the master layers, and for each
+group of bracket layers with the same axis rules the bracket layers plus the master layers
+standing in for masters without one (as Glyphs and glyphsLib resolve them). Only masters
+the variable export uses count ("Disable Masters" of the variable instance), and bracket
+groups outside the axis ranges are left out. Within a set, path count, node count, node
+types, open/closed, direction and start point are compared against the first layer.
+"""
+
+import argparse
+import math
+import sys
+import time
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Start nodes of closed paths further apart than this angle around the path center count as moved
+START_POINT_ANGLE = 90.0
+
+
+def rules_key(axis_rules):
+    """
+    Hashable form of the axis rules of a bracket layer, from the engine's {"a01": {...}} dict
+    or the per-axis list of a .glyphs file. An empty key covers the whole designspace.
+    """
+    if not axis_rules:
+        return ()
+    if isinstance(axis_rules, dict):
+        items = sorted(axis_rules.items())
+    else:
+        items = list(enumerate(axis_rules))
+    return tuple((axis, tuple(sorted(dict(rule).items()))) for axis, rule in items if rule)
+
+
+def structure(paths):
+    """Everything that has to match for two layers to interpolate, without geometry"""
+    return tuple((path.closed, path.types) for path in paths)
+
+
+def _on_curve_points(path):
+    coordinates = path.coordinates
+    return [(coordinates[2 * index], coordinates[2 * index + 1]) for index, code in enumerate(path.types) if code != 'o']
+
+
+def _signed_area(points):
+    area = 0.0
+    for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+        area += x0 * y1 - x1 * y0
+    return area / 2
+
+
+def _start_angle(points):
+    center_x = sum(x for x, _ in points) / len(points)
+    center_y = sum(y for _, y in points) / len(points)
+    return math.degrees(math.atan2(points[0][1] - center_y, points[0][0] - center_x))
+
+
+def _geometry_problems(set_name, label, paths, reference_label, reference_paths):
+    """Direction and start point, only for layers whose structure already matches"""
+    problems = []
+    for number, (path, reference) in enumerate(zip(paths, reference_paths)):
+        points = _on_curve_points(path)
+        reference_points = _on_curve_points(reference)
+        if len(points) < 2:
+            continue
+        if path.closed:
+            area = _signed_area(points)
+            reference_area = _signed_area(reference_points)
+            if area * reference_area < 0:
+                problems.append((ERROR, f"{set_name}: path {number} of {label} runs in the other direction than in {reference_label}"))
+                continue
+            difference = abs(_start_angle(points) - _start_angle(reference_points)) % 360
+            if min(difference, 360 - difference) > START_POINT_ANGLE:
+                problems.append((WARNING, f"{set_name}: path {number} of {label} starts at a different point than in {reference_label}"))
+        else:
+            dx = points[-1][0] - points[0][0]
+            dy = points[-1][1] - points[0][1]
+            reference_dx = reference_points[-1][0] - reference_points[0][0]
+            reference_dy = reference_points[-1][1] - reference_points[0][1]
+            if dx * reference_dx + dy * reference_dy < 0:
+                problems.append((WARNING, f"{set_name}: open path {number} of {label} runs in the other direction than in {reference_label}"))
+    return problems
+
+
+def _structure_problems(set_name, label, paths, reference_label, reference_paths):
+    if len(paths) != len(reference_paths):
+        return [(ERROR, f"{set_name}: {label} has {len(paths)} paths, {reference_label} has {len(reference_paths)}")]
+    problems = []
+    for number, (path, reference) in enumerate(zip(paths, reference_paths)):
+        if path.closed != reference.closed:
+            problems.append((ERROR, f"{set_name}: path {number} is {'closed' if path.closed else 'open'} in {label} but not in {reference_label}"))
+        elif len(path.types) != len(reference.types):
+            problems.append((ERROR, f"{set_name}: path {number} has {len(path.types)} nodes in {label}, {len(reference.types)} in {reference_label}"))
+        elif path.types != reference.types:
+            node = next(index for index, (code, other) in enumerate(zip(path.types, reference.types)) if code != other)
+            problems.append((ERROR, f"{set_name}: path {number} node {node} is '{path.types[node]}' in {label}, '{reference.types[node]}' in {reference_label}"))
+    return problems
+
+
+def check_layers(set_name, layers):
+    """Problems of one interpolation set, a list of (label, paths), as (severity, message)"""
+    if len(layers) < 2:
+        return []
+    reference_label, reference_paths = layers[0]
+    reference_structure = structure(reference_paths)
+    problems = []
+    for label, paths in layers[1:]:
+        # Whole layers compare as one tuple, the detailed diagnosis only runs on a mismatch
+        if structure(paths) != reference_structure:
+            problems.extend(_structure_problems(set_name, label, paths, reference_label, reference_paths))
+        else:
+            problems.extend(_geometry_problems(set_name, label, paths, reference_label, reference_paths))
+    return problems
+
+
+def interpolation_sets(master_layers, bracket_layers, designspace=None):
+    """
+    [(set name, [(label, paths)], covers the whole designspace)] of a glyph.
+    `master_layers` is [(label, paths)] in master order, `bracket_layers` is
+    [(master index, axis rules, label, paths)]. With a multi_line_build.Designspace only
+    its exported masters are checked, and bracket groups that never apply are left out.
+    """
+    if designspace is None:
+        exported = list(range(len(master_layers)))
+    else:
+        exported = [master for master in designspace.masters if master < len(master_layers)]
+    sets = [("masters", [master_layers[master] for master in exported], False)]
+    groups = {}
+    for master, axis_rules, label, paths in bracket_layers:
+        if master in exported:
+            groups.setdefault(rules_key(axis_rules), {})[master] = (label, paths)
+    for key, layers in groups.items():
+        if designspace is None:
+            covers = not key
+        else:
+            box = designspace.box(key)
+            if box is None:
+                continue
+            covers = designspace.covers(box)
+        sets.append((f"bracket {describe_rules(key)}", [layers.get(master, master_layers[master]) for master in exported], covers))
+    return sets
+
+
+def describe_rules(key):
+    if not key:
+        return "[all]"
+    parts = []
+    for axis, rule in key:
+        rule = dict(rule)
+        parts.append(f"{axis}:{rule.get('min', '')}..{rule.get('max', '')}")
+    return f"[{','.join(parts)}]"
+
+
+def check_glyph(master_layers, bracket_layers, designspace=None):
+    """
+    (severity, message) problems of one glyph, see interpolation_sets for `designspace`.
+    Incompatible master layers are only a warning when a compatible bracket group covering
+    the whole designspace replaces them everywhere.
+    """
+    problems = []
+    covered = False
+    for set_name, layers, covers in interpolation_sets(master_layers, bracket_layers, designspace):
+        set_problems = check_layers(set_name, layers)
+        if covers and not any(severity == ERROR for severity, _ in set_problems):
+            covered = True
+        problems.append((set_name, set_problems))
+    result = []
+    for set_name, set_problems in problems:
+        for severity, message in set_problems:
+            if set_name == "masters" and covered and severity == ERROR:
+                severity = WARNING
+                message += " (replaced everywhere by bracket layers)"
+            result.append((severity, message))
+    return result
+
+
+# --- .glyphs files ---
+
+def glyph_layers(font, glyph):
+    """(master_layers, bracket_layers) of a glyph dict, None if a master layer is missing"""
+    from multi_line_headless import master_ids, master_layers, path_from_shape, is_path
+
+    ids = master_ids(font)
+    names = {master['id']: master.get('name', master['id']) for master in font.get('fontMaster', [])}
+    layers = master_layers(glyph, ids)
+    if None in layers:
+        return None
+    masters = [(names[master_id], [path_from_shape(shape) for shape in layer.get('shapes', []) if is_path(shape)]) for master_id, layer in zip(ids, layers)]
+    brackets = []
+    for layer in glyph.get('layers', []):
+        master_id = layer.get('associatedMasterId')
+        if master_id not in ids or 'axisRules' not in layer.get('attr', {}):
+            continue
+        label = layer.get('name') or f"{names[master_id]} bracket"
+        brackets.append((ids.index(master_id), layer['attr']['axisRules'], label, [path_from_shape(shape) for shape in layer.get('shapes', []) if is_path(shape)]))
+    return masters, brackets
+
+
+def check_font(font, patterns=None, names=None):
+    """{glyph name: [(severity, message)]} for every glyph with problems, limited to `patterns` or exact `names`"""
+    from multi_line_build import Designspace
+    from multi_line_headless import glyph_matches
+
+    designspace = Designspace(font)
+    report = {}
+    names = set(names) if names is not None else None
+    for glyph in font.get('glyphs', []):
+        name = glyph.get('glyphname')
+        if not glyph_matches(name, patterns) or (names is not None and name not in names):
+            continue
+        layers = glyph_layers(font, glyph)
+        if layers is None:
+            report[name] = [(ERROR, "missing master layer")]
+            continue
+        problems = check_glyph(*layers, designspace)
+        if problems:
+            report[name] = problems
+    return report
+
+
+def print_report(report, show_warnings=True):
+    errors = 0
+    warnings = 0
+    for name, problems in report.items():
+        shown = [(severity, message) for severity, message in problems if show_warnings or severity == ERROR]
+        errors += sum(1 for severity, _ in problems if severity == ERROR)
+        warnings += sum(1 for severity, _ in problems if severity == WARNING)
+        if shown:
+            print(name)
+            for severity, message in shown:
+                print(f"  {severity}: {message}")
+    print(f"Compatibility: {errors} errors, {warnings} warnings in {len(report)} glyphs")
+    return errors
+
+
+def main(argv=None):
+    import glyphs_plist
+
+    parser = argparse.ArgumentParser(description="Check interpolation compatibility of a .glyphs file")
+    parser.add_argument('source', help=".glyphs file")
+    parser.add_argument('--glyphs', help="comma separated glyph names or patterns, e.g. 'A,B,a*'")
+    parser.add_argument('--errors-only', action='store_true', help="don't list warnings")
+    args = parser.parse_args(argv)
+    patterns = [pattern.strip() for pattern in args.glyphs.split(',') if pattern.strip()] if args.glyphs else None
+    from multi_line_headless import glyph_matches
+
+    start = time.time()
+    with glyphs_plist.GlyphsFile(args.source) as source:
+        font = source.font([name for name in source.names if glyph_matches(name, patterns)])
+    report = check_font(font, patterns)
+    errors = print_report(report, not args.errors_only)
+    print(f"Checked in {time.time() - start:.2f}s")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1218 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Geometry engine for the Multi Line Variable script.
+Works on plain path data so the same generation runs inside GlyphsApp and headless.
+"""
+
+import hashlib
+import math
+from array import array
+
+from multi_line_profile import NULL_PROFILER
+
+# Stroke attributes carried over from an original path to its duplicates
+STROKE_ATTRIBUTES = ['lineCapStart', 'lineCapEnd', 'strokeWidth', 'strokeHeight', 'strokePos']
+
+# Bracket layers of masters 2-5 are active below 100 on both axes
+BRACKET_AXIS_RULES = {"a01": {"max": 100}, "a02": {"max": 100}}
+
+# Vertices whose miter would be longer than this many offsets fall back to a bevel
+MITER_LIMIT = 4.0
+
+# Maximum node distance (units) at which the native offset counts as matching the Offset Curve filter
+OFFSET_TOLERANCE = 0.5
+
+# Bump whenever a change to the engine changes its output, so cached glyphs get regenerated
+ENGINE_VERSION = 4
+
+# Glyph userData key holding the generation key of the last run
+GENERATION_KEY = 'com.multiline.generationKey'
+
+# Path attributes the generator writes on every path, they don't influence the result
+GENERATED_ATTRIBUTES = ('strokeWidth', 'strokeHeight', 'mlv_type', 'offset_direction', 'offset_line')
+
+
+# Node types by the one letter code used in .glyphs files and in Path.types
+NODE_TYPES = {'l': 'line', 'c': 'curve', 'o': 'offcurve', 'q': 'qcurve'}
+NODE_CODES = {value: key for key, value in NODE_TYPES.items()}
+
+
+class Node:
+    """One node, used to build a Path and to read its nodes back, `data` is its userData or None"""
+    __slots__ = ('x', 'y', 'type', 'smooth', 'data')
+
+    def __init__(self, x, y, type='line', smooth=False, data=None):
+        self.x = x
+        self.y = y
+        self.type = type
+        self.smooth = smooth
+        self.data = data
+
+    def __repr__(self):
+        return f"<Node {self.x} {self.y} {self.type}{' smooth' if self.smooth else ''}>"
+
+
+class Path:
+    """
+    Plain copy of a GSPath in flat buffers: coordinates (x0, y0, x1, y1, ...) as an array of
+    doubles, one NODE_TYPES code per node in `types`, one smooth flag per node in `smooth`,
+    plus the closed flag and attributes. `node_data` holds the userData of every node (None
+    for nodes without) and is None itself when no node has any.
+    The buffers are never changed in place, operations that move nodes bind new ones, so
+    copies share the geometry and only duplicate the attributes.
+    """
+    __slots__ = ('coordinates', 'types', 'smooth', 'closed', 'attributes', 'node_data')
+
+    def __init__(self, coordinates=None, types='', smooth=b'', closed=False, attributes=None, node_data=None):
+        self.coordinates = coordinates if coordinates is not None else array('d')
+        self.types = types
+        self.smooth = smooth
+        self.closed = closed
+        self.attributes = attributes if attributes is not None else {}
+        self.node_data = node_data
+
+    @classmethod
+    def from_nodes(cls, nodes, closed=False, attributes=None):
+        coordinates = array('d')
+        for node in nodes:
+            coordinates.append(node.x)
+            coordinates.append(node.y)
+        types = ''.join(NODE_CODES[node.type] for node in nodes)
+        smooth = bytes(bool(node.smooth) for node in nodes)
+        node_data = tuple(node.data or None for node in nodes)
+        return cls(coordinates, types, smooth, closed, attributes, node_data if any(node_data) else None)
+
+    @property
+    def node_count(self):
+        return len(self.types)
+
+    @property
+    def nodes(self):
+        """The nodes as new Node objects, for reading only"""
+        coordinates = self.coordinates
+        node_data = self.node_data or (None,) * len(self.types)
+        return [Node(coordinates[2 * index], coordinates[2 * index + 1], NODE_TYPES[code], bool(self.smooth[index]), node_data[index]) for index, code in enumerate(self.types)]
+
+    def copy(self):
+        return Path(self.coordinates, self.types, self.smooth, self.closed, dict(self.attributes), self.node_data)
+
+    def translate(self, dx, dy=0):
+        coordinates = array('d', self.coordinates)
+        for index in range(0, len(coordinates), 2):
+            coordinates[index] += dx
+            coordinates[index + 1] += dy
+        self.coordinates = coordinates
+
+    def __repr__(self):
+        return f"<Path {self.node_count} nodes {'closed' if self.closed else 'open'}>"
+
+
+class Settings:
+    """
+    Generation settings. `line_count` parallel lines are drawn per stroke, `original_offset`
+    apart, half of it on centered strokes without `maintain_y_position`. `line_widths` optionally gives the stroke width of every line per master (see
+    line_stroke_widths), by default each master spreads its recipe widths over the lines.
+    """
+
+    def __init__(self, original_offset=-70, min_stroke_width=10, medium_stroke_width=35, max_stroke_width=60, maintain_y_position=True, line_count=2, line_widths=None):
+        self.original_offset = original_offset
+        self.min_stroke_width = min_stroke_width
+        self.medium_stroke_width = medium_stroke_width
+        self.max_stroke_width = max_stroke_width
+        self.maintain_y_position = maintain_y_position
+        self.line_count = line_count
+        self.line_widths = line_widths
+
+
+def set_stroke_attributes(path, width, height):
+    """Helper function to set stroke attributes with proper line caps"""
+    path.attributes['strokeWidth'] = width
+    path.attributes['strokeHeight'] = height
+    # Don't set line caps here, they will be copied from original path
+
+
+def copy_stroke_attributes(source, target):
+    for attr in STROKE_ATTRIBUTES:
+        if attr in source.attributes:
+            target.attributes[attr] = source.attributes[attr]
+
+
+def is_centered(path):
+    return path.attributes.get('strokePos', 0) == 0
+
+
+def calculate_diagonal_offset(path, desired_distance):
+    """
+    Calculate the offset vector and correction needed to ensure
+    that the measured distance between the duplicated paths at 90 degrees
+    is exactly desired_distance.
+
+    Returns (normal_x, normal_y, corrected_offset_per_side)
+    """
+    if path.node_count < 2:
+        return (0, 0, desired_distance)
+
+    x1, y1, x2, y2 = path.coordinates[:4]
+
+    dx = x2 - x1
+    dy = y2 - y1
+
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return (0, 0, desired_distance)
+
+    # Normalize the direction vector
+    dx /= length
+    dy /= length
+
+    # Calculate the angle
+    angle_rad = math.atan2(dy, dx)
+
+    # Normal vector (90 degree rotated)
+    normal_x = dy
+    normal_y = -dx
+
+    # For horizontal lines (dy ≈ 0), we want to use the full offset
+    if abs(dy) < 1e-6:
+        return (0, 1, desired_distance / 2)  # Return vertical normal for horizontal lines
+
+    # For vertical lines (dx ≈ 0), we want to use the full offset
+    if abs(dx) < 1e-6:
+        return (1, 0, desired_distance / 2)  # Return horizontal normal for vertical lines
+
+    # For diagonal lines, calculate the correction factor
+    correction_factor = abs(math.sin(angle_rad))  # if measuring horizontally
+    if correction_factor == 0:
+        correction_factor = 1e-6  # avoid division by zero
+
+    corrected_offset_per_side = (desired_distance / 2) / correction_factor
+
+    return (normal_x, normal_y, corrected_offset_per_side)
+
+
+# --- Offsetting ---
+
+def _vertex_shift(n1x, n1y, s1x, s1y, n2x, n2y, s2x, s2y):
+    """Shift of a vertex between two edges moved by s1 and s2 so both moved edges pass through it (miter join)"""
+    det = n1x * n2y - n1y * n2x
+    if abs(det) < 1e-9:
+        return ((s1x + s2x) / 2, (s1y + s2y) / 2)
+    a = s1x * n1x + s1y * n1y
+    b = s2x * n2x + s2y * n2y
+    mx = (a * n2y - b * n1y) / det
+    my = (n1x * b - n2x * a) / det
+    if math.hypot(mx, my) > MITER_LIMIT * max(math.hypot(s1x, s1y), math.hypot(s2x, s2y)):
+        return ((s1x + s2x) / 2, (s1y + s2y) / 2)
+    return (mx, my)
+
+
+class NormalsIndex:
+    """
+    Flat index of the control polygon edges of a list of paths: unit direction, normal and
+    correction factor of every edge, plus the incoming and outgoing edge of every node.
+    Built once per glyph and shared by every offset of its paths.
+
+    Edge i runs from node i to the next node of its path, the normal is the right-hand side
+    of the path direction (direction_y, -direction_x). Zero-length edges (retracted handles)
+    are not valid, nodes next to them use the nearest valid edge instead.
+    """
+    __slots__ = ('paths', 'xs', 'ys', 'ranges', 'direction_x', 'direction_y', 'correction', 'valid', 'incoming', 'outgoing')
+
+    def __init__(self, paths):
+        self.paths = paths
+        xs = []
+        ys = []
+        ranges = []
+        for path in paths:
+            start = len(xs)
+            xs.extend(path.coordinates[0::2])
+            ys.extend(path.coordinates[1::2])
+            ranges.append((start, len(xs), path.closed))
+        total = len(xs)
+
+        direction_x = [0.0] * total
+        direction_y = [0.0] * total
+        valid = [False] * total
+        for start, end, closed in ranges:
+            last = end if closed else end - 1
+            for index in range(start, last):
+                following = index + 1 if index + 1 < end else start
+                dx = xs[following] - xs[index]
+                dy = ys[following] - ys[index]
+                length = math.hypot(dx, dy)
+                if length > 1e-9:
+                    direction_x[index] = dx / length
+                    direction_y[index] = dy / length
+                    valid[index] = True
+
+        incoming = [-1] * total
+        outgoing = [-1] * total
+        for start, end, closed in ranges:
+            rounds = 2 if closed else 1
+            last_edge = -1
+            for _ in range(rounds):
+                for index in range(start, end):
+                    incoming[index] = last_edge
+                    if valid[index]:
+                        last_edge = index
+            last_edge = -1
+            for _ in range(rounds):
+                for index in range(end - 1, start - 1, -1):
+                    if valid[index]:
+                        last_edge = index
+                    outgoing[index] = last_edge
+            # End nodes of open paths only have one edge
+            for index in range(start, end):
+                if incoming[index] < 0:
+                    incoming[index] = outgoing[index]
+                if outgoing[index] < 0:
+                    outgoing[index] = incoming[index]
+
+        self.xs = xs
+        self.ys = ys
+        self.ranges = ranges
+        self.direction_x = direction_x
+        self.direction_y = direction_y
+        # |sin| of the edge angle: how much of a horizontal shift is perpendicular to the edge
+        self.correction = [abs(dy) for dy in direction_y]
+        self.valid = valid
+        self.incoming = incoming
+        self.outgoing = outgoing
+
+    def anisotropic_shifts(self, number, horizontal, vertical):
+        """Edge shifts of path `number` like the Offset Curve filter: horizontal * normal_x, vertical * normal_y"""
+        start, end, _ = self.ranges[number]
+        shift_x = [horizontal * self.direction_y[edge] for edge in range(start, end)]
+        shift_y = [-vertical * self.direction_x[edge] for edge in range(start, end)]
+        return shift_x, shift_y
+
+    def maintain_y_side(self, number):
+        """
+        Side of the path the positive duplicate goes to, decided by the first segment
+        the same way calculate_diagonal_offset does: diagonals always move right first.
+        """
+        start, end, _ = self.ranges[number]
+        edge = self.outgoing[start] if end > start else -1
+        if edge < 0:
+            return 1
+        if abs(self.direction_y[edge]) < 1e-6 or abs(self.direction_x[edge]) < 1e-6:
+            return 1
+        return 1 if self.direction_y[edge] > 0 else -1
+
+    def maintain_y_shifts(self, number, distance):
+        """
+        Edge shifts of path `number` that put a duplicate at `distance` / 2 from every segment.
+        Horizontal segments move vertically, all others horizontally with their own correction
+        factor, so end points keep their height even on bent strokes.
+        """
+        start, end, _ = self.ranges[number]
+        half = self.maintain_y_side(number) * distance / 2
+        shift_x = []
+        shift_y = []
+        for edge in range(start, end):
+            if not self.valid[edge]:
+                shift_x.append(0.0)
+                shift_y.append(0.0)
+            elif self.correction[edge] < 1e-6:
+                shift_x.append(0.0)
+                shift_y.append(-half * self.direction_x[edge])
+            else:
+                shift_x.append(half / self.direction_y[edge])
+                shift_y.append(0.0)
+        return shift_x, shift_y
+
+    def node_shifts(self, number, shift_x, shift_y):
+        """(dx, dy) of every node of path `number` with its edges moved by their shifts, on the miter of its edges"""
+        start, end, _ = self.ranges[number]
+        direction_x = self.direction_x
+        direction_y = self.direction_y
+        shifts = []
+        for index in range(start, end):
+            edge_in = self.incoming[index]
+            edge_out = self.outgoing[index]
+            if edge_in < 0:
+                shifts.append((0.0, 0.0))
+                continue
+            local_in = edge_in - start
+            local_out = edge_out - start
+            shifts.append(_vertex_shift(
+                direction_y[edge_in], -direction_x[edge_in], shift_x[local_in], shift_y[local_in],
+                direction_y[edge_out], -direction_x[edge_out], shift_x[local_out], shift_y[local_out],
+            ))
+        return shifts
+
+    def offsets(self, number, shift_x, shift_y, factors=(1,)):
+        """
+        New paths for path `number`, one per factor, with every edge moved by factor times its shift.
+        Miter and bevel joins scale with the shifts, so the joins are solved once and every
+        further line only costs one multiply-add per coordinate.
+        """
+        start, end, closed = self.ranges[number]
+        path = self.paths[number]
+        xs = self.xs[start:end]
+        ys = self.ys[start:end]
+        shifts = self.node_shifts(number, shift_x, shift_y)
+        results = []
+        for factor in factors:
+            coordinates = array('d')
+            for x, y, (dx, dy) in zip(xs, ys, shifts):
+                coordinates.append(x + factor * dx)
+                coordinates.append(y + factor * dy)
+            results.append(Path(coordinates, path.types, path.smooth, closed, dict(path.attributes), path.node_data))
+        return results
+
+    def offset(self, number, shift_x, shift_y):
+        """New path for path `number` with every edge moved by its shift, nodes on the miter of their edges"""
+        return self.offsets(number, shift_x, shift_y)[0]
+
+
+def offset_paths(requests):
+    """
+    Native replacement for the Offset Curve filter, without Make Stroke.
+    Offsets every (path, horizontal, vertical) request with one shared normals index and
+    returns new paths with the same attributes, in request order. Every edge moves along
+    its normal and each node lands on the intersection of its two moved edges
+    (Tiller-Hanson), exact for lines and a close approximation for cubic segments.
+    """
+    index = NormalsIndex([path for path, _, _ in requests])
+    return [index.offset(number, *index.anisotropic_shifts(number, horizontal, vertical)) for number, (_, horizontal, vertical) in enumerate(requests)]
+
+
+def offset_path(path, horizontal, vertical):
+    """Offset a single path, see offset_paths"""
+    return offset_paths([(path, horizontal, vertical)])[0]
+
+
+def offset_deviation(path, reference):
+    """Largest node distance between two paths, None if their structure differs"""
+    if path.types != reference.types or path.closed != reference.closed:
+        return None
+    deviation = 0.0
+    coordinates = path.coordinates
+    other = reference.coordinates
+    for index in range(0, len(coordinates), 2):
+        deviation = max(deviation, math.hypot(coordinates[index] - other[index], coordinates[index + 1] - other[index + 1]))
+    return deviation
+
+
+# --- Generation ---
+
+def line_factors(line_count, maintain_y):
+    """
+    Position of every duplicate line: centered strokes that keep their y position spread
+    their lines evenly around the original in half offsets, first line on the positive side
+    (2 lines: +1, -1), other strokes keep the original as line 0 (1, 2, ... offsets for the duplicates).
+    The offset of the other strokes is halved on centered strokes, so their lines are half as far apart.
+    """
+    if maintain_y:
+        return [line_count - 1 - 2 * line for line in range(line_count)]
+    return list(range(1, line_count))
+
+
+def process_paths(original_paths, settings, offset_function=None):
+    """
+    Tag originals and build their duplicates, settings.line_count lines per path.
+    By default all offsets come from one NormalsIndex of the original paths, all lines of
+    a path from one pass over its nodes. An `offset_function` mapping
+    [(path, horizontal, vertical)] to offset paths (None where an offset failed) replaces
+    it, e.g. with the Offset Curve filter; its requests are collected and sent in one call.
+    Returns (processed_paths_master1, processed_paths_other).
+    """
+    index = NormalsIndex(original_paths) if offset_function is None else None
+    offset_results = []
+    requests = []
+
+    def request_offset(path, horizontal, vertical):
+        """Slot of an offset_function result, filled in after the one batched call"""
+        offset_results.append(None)
+        requests.append((len(offset_results) - 1, (path, horizontal, vertical)))
+        return len(offset_results) - 1
+
+    def request_offsets(number, shifts, factors):
+        """Slots of the normals index offsets of all lines of a path"""
+        first = len(offset_results)
+        offset_results.extend(index.offsets(number, *shifts, factors))
+        return list(range(first, len(offset_results)))
+
+    plan = []
+    for number, path in enumerate(original_paths):
+        centered = is_centered(path)
+        if centered and settings.maintain_y_position:
+            # For centered paths, create one offset path per line,
+            # the first shifted furthest in positive, the last in negative direction
+            factors = line_factors(settings.line_count, True)
+            if index is not None:
+                # Every segment gets its own correction factor from the normals index
+                slots = request_offsets(number, index.maintain_y_shifts(number, settings.original_offset), factors)
+            else:
+                # Filter offsets only know x or y, the first segment decides for the whole path
+                normal_x, normal_y, offset = calculate_diagonal_offset(path, settings.original_offset)
+                slots = []
+                for sign in factors:
+                    if abs(normal_x) < 1e-6:  # If line is vertical
+                        y_offset = sign * offset / normal_y if abs(normal_y) > 1e-6 else sign * offset
+                        slots.append(request_offset(path, 0, y_offset))
+                    else:
+                        slots.append(request_offset(path, sign * offset / normal_x, 0))
+            plan.append((path, True, slots))
+        else:
+            # For non-centered or not maintaining Y, keep original and create offset paths
+            # (adjust offset value if stroke is centered)
+            offset_value = settings.original_offset / 2 if centered else settings.original_offset
+            factors = line_factors(settings.line_count, False)
+            if index is not None:
+                slots = request_offsets(number, index.anisotropic_shifts(number, offset_value, offset_value), factors)
+            else:
+                slots = [request_offset(path, factor * offset_value, factor * offset_value) for factor in factors]
+            plan.append((path, False, slots))
+
+    if requests:
+        for (slot, _), result in zip(requests, offset_function([request for _, request in requests])):
+            offset_results[slot] = result
+
+    processed_paths_master1 = []
+    processed_paths_other = []
+    for path, maintain_y, slots in plan:
+        orig = path.copy()
+        orig.attributes['mlv_type'] = 'original'
+        processed_paths_master1.append(orig)
+        if maintain_y:
+            # Only the original goes to master 1, the other masters get all duplicates
+            for offset_direction, slot in enumerate(slots):
+                duplicate = offset_results[slot]
+                if duplicate is not None:
+                    copy_stroke_attributes(path, duplicate)
+                    duplicate.attributes['mlv_type'] = 'duplicate'
+                    duplicate.attributes['offset_direction'] = offset_direction
+                    processed_paths_other.append(duplicate)
+        else:
+            processed_paths_other.append(orig.copy())
+            for line, slot in enumerate(slots, 1):
+                duplicate = offset_results[slot]
+                if duplicate is None:
+                    duplicate = path.copy()
+                copy_stroke_attributes(path, duplicate)
+                duplicate.attributes['mlv_type'] = 'duplicate'
+                # The first duplicate is line 1 without a tag, as in two-line fonts
+                if line > 1:
+                    duplicate.attributes['offset_line'] = line
+                processed_paths_other.append(duplicate)
+    return processed_paths_master1, processed_paths_other
+
+
+def _with_stroke(path, width):
+    new_path = path.copy()
+    set_stroke_attributes(new_path, width, width)
+    return new_path
+
+
+class MasterRecipe:
+    """
+    How one master is built. `source` picks the paths it is made of: 'originals' (the
+    tagged originals of every path), 'processed' (originals kept next to their duplicates,
+    plus all duplicates) or 'unprocessed' (the master 1 paths as they were). `widths` are
+    the 'min', 'medium' or 'max' stroke width of the first and the last line (see path_line),
+    the lines in between get widths evenly spread between the two.
+    The bracket layer gets `bracket_source` at min width.
+    """
+    __slots__ = ('source', 'widths', 'bracket_source', 'bracket_axis_rules')
+
+    def __init__(self, source, widths, bracket_source, bracket_axis_rules):
+        self.source = source
+        self.widths = widths
+        self.bracket_source = bracket_source
+        self.bracket_axis_rules = bracket_axis_rules
+
+
+# One recipe per master, in master order. Changing them changes the output, bump ENGINE_VERSION.
+# With two lines the first is the original (or duplicate 0 of a centered path that keeps its
+# y position) and the last the duplicate (duplicate 1).
+MASTER_RECIPES = (
+    # Master 1: only original paths
+    MasterRecipe('originals', ('min', 'min'), 'processed', {}),
+    # Master 2: all lines at min width
+    MasterRecipe('processed', ('min', 'min'), 'unprocessed', BRACKET_AXIS_RULES),
+    # Master 3: first line medium down to min for the last
+    MasterRecipe('processed', ('medium', 'min'), 'unprocessed', BRACKET_AXIS_RULES),
+    # Master 4: first line min up to max for the last
+    MasterRecipe('processed', ('min', 'max'), 'unprocessed', BRACKET_AXIS_RULES),
+    # Master 5: all lines at max width
+    MasterRecipe('processed', ('max', 'max'), 'unprocessed', BRACKET_AXIS_RULES),
+)
+
+# Masters a font needs, the first MASTER_COUNT masters get generated layers
+MASTER_COUNT = len(MASTER_RECIPES)
+
+
+def path_line(path):
+    """
+    Line of a path from the tags process_paths sets: 0 for originals, the offset_direction
+    of duplicates of centered paths that keep their y position, the offset_line of other
+    duplicates (1 when untagged).
+    """
+    attributes = path.attributes
+    if attributes.get('mlv_type') == 'original':
+        return 0
+    if 'offset_direction' in attributes:
+        return int(attributes['offset_direction'])
+    return int(attributes.get('offset_line', 1))
+
+
+def _stroke_widths(settings):
+    return {'min': settings.min_stroke_width, 'medium': settings.medium_stroke_width, 'max': settings.max_stroke_width}
+
+
+def parse_line_widths(text):
+    """
+    'min;medium,min,min;min,medium,max;max' as line_widths: masters separated by ';',
+    the widths of their lines by ',', each a number or min, medium or max. Empty text is None.
+    """
+    if not text or not text.strip():
+        return None
+    masters = []
+    for item in text.split(';'):
+        widths = []
+        for width in item.split(','):
+            width = width.strip()
+            if width in ('min', 'medium', 'max'):
+                widths.append(width)
+            elif width:
+                widths.append(float(width))
+        masters.append(tuple(widths))
+    return tuple(masters)
+
+
+def line_stroke_widths(settings, recipes=MASTER_RECIPES):
+    """
+    Stroke width of every line, per master. settings.line_widths has one entry per master
+    with a width per line, or a single width for all of them; master 1 only draws originals
+    with the first width. Without it the recipe widths are spread over the lines.
+    Raises ValueError if line_widths doesn't fit the masters or the line count.
+    """
+    names = _stroke_widths(settings)
+    line_count = max(1, settings.line_count)
+    if settings.line_widths:
+        if len(settings.line_widths) != len(recipes):
+            raise ValueError(f"Line widths for {len(settings.line_widths)} masters, expected {len(recipes)}")
+        result = []
+        for master, widths in enumerate(settings.line_widths, 1):
+            if len(widths) == 1:
+                widths = tuple(widths) * line_count
+            elif len(widths) != line_count:
+                raise ValueError(f"Master {master} has {len(widths)} line widths, expected 1 or {line_count}")
+            result.append([names[width] if isinstance(width, str) else width for width in widths])
+        return result
+    result = []
+    for recipe in recipes:
+        first, last = names[recipe.widths[0]], names[recipe.widths[1]]
+        if first == last or line_count == 1:
+            result.append([first] * line_count)
+            continue
+        # Lines in between are rounded to 3 decimals, the ends stay exact
+        inner = [round(first + (last - first) * line / (line_count - 1), 3) for line in range(1, line_count - 1)]
+        result.append([first] + inner + [last])
+    return result
+
+
+def build_master_paths(processed_paths_master1, processed_paths_other, settings, recipes=MASTER_RECIPES):
+    """
+    Paths for each master, in master order.
+    Every path is visited once and handed to all masters whose recipe takes its source,
+    with the stroke width of its line in that master.
+    """
+    widths = line_stroke_widths(settings, recipes)
+    sources = {'originals': processed_paths_master1, 'processed': processed_paths_other}
+    master_paths = [[] for _ in recipes]
+    for source, paths in sources.items():
+        targets = [(master_paths[index], widths[index]) for index, recipe in enumerate(recipes) if recipe.source == source]
+        if not targets:
+            continue
+        for path in paths:
+            line = path_line(path)
+            for target, line_widths in targets:
+                target.append(_with_stroke(path, line_widths[min(line, len(line_widths) - 1)]))
+    return master_paths
+
+
+def build_bracket_paths(original_paths, processed_paths_other, settings, recipes=MASTER_RECIPES):
+    """(axis_rules, paths) for the bracket layer of each master, all paths thickness min_stroke_width"""
+    sources = {'processed': processed_paths_other, 'unprocessed': original_paths}
+    return [(dict(recipe.bracket_axis_rules), [_with_stroke(path, settings.min_stroke_width) for path in sources[recipe.bracket_source]]) for recipe in recipes]
+
+
+class OffsetCache:
+    """
+    process_paths results by glyph name and the settings they depend on, for runs over
+    the same source that only change stroke widths. The cached paths are never modified,
+    build_master_paths and build_bracket_paths work on copies.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, original_paths, settings, offset_function=None):
+        key = (name, settings.original_offset, settings.maintain_y_position, settings.line_count)
+        processed = self.entries.get(key)
+        if processed is None:
+            processed = self.entries[key] = process_paths(original_paths, settings, offset_function)
+            self.misses += 1
+        else:
+            self.hits += 1
+        return processed
+
+
+def generate_glyph(original_paths, settings, offset_function=None, profiler=NULL_PROFILER, processed=None):
+    """
+    Run the whole generation for one glyph.
+    `processed` takes the process_paths result from an OffsetCache instead of offsetting again.
+    Returns (master_paths, bracket_layers) with one entry per master,
+    pass them through compact_bracket_layers before writing them.
+    """
+    if processed is None:
+        with profiler.stage('offset'):
+            processed = process_paths(original_paths, settings, offset_function)
+    processed_paths_master1, processed_paths_other = processed
+    with profiler.stage('master_paths'):
+        master_paths = build_master_paths(processed_paths_master1, processed_paths_other, settings)
+    with profiler.stage('bracket_paths'):
+        bracket_layers = build_bracket_paths(original_paths, processed_paths_other, settings)
+    return master_paths, bracket_layers
+
+
+# --- Bracket layer compaction ---
+
+def outline_signature(paths):
+    """What a compiler sees of a layer: nodes as written (3 decimals), closed flags and stroke attributes"""
+    signature = []
+    for path in paths:
+        attributes = tuple(str(path.attributes.get(key)) for key in STROKE_ATTRIBUTES)
+        coordinates = tuple(round(value, 3) for value in path.coordinates)
+        signature.append((path.closed, path.types, coordinates, attributes))
+    return tuple(signature)
+
+
+def same_outline(paths, reference):
+    """
+    outline_signature(paths) == outline_signature(reference), with the cheap differences
+    (path and node counts, node types, closed flags) ruled out before any coordinate is rounded.
+    """
+    if len(paths) != len(reference):
+        return False
+    for path, other in zip(paths, reference):
+        if path.closed != other.closed or path.types != other.types:
+            return False
+    for path, other in zip(paths, reference):
+        if any(str(path.attributes.get(key)) != str(other.attributes.get(key)) for key in STROKE_ATTRIBUTES):
+            return False
+    for path, other in zip(paths, reference):
+        if path.coordinates != other.coordinates and any(round(a, 3) != round(b, 3) for a, b in zip(path.coordinates, other.coordinates)):
+            return False
+    return True
+
+
+def _rules_key(axis_rules):
+    return repr(sorted(axis_rules.items()))
+
+
+def resolved_bracket_layers(master_paths, bracket_layers):
+    """
+    {axis rules: [outline signature per master]} as the variable font is built from it:
+    Glyphs and glyphsLib use the master layer for every master without a bracket layer
+    of the same axis rules.
+    """
+    groups = {}
+    for master, bracket in enumerate(bracket_layers):
+        if bracket is not None:
+            groups.setdefault(_rules_key(bracket[0]), {})[master] = bracket[1]
+    return {rules: [outline_signature(layers.get(master, paths)) for master, paths in enumerate(master_paths)] for rules, layers in groups.items()}
+
+
+def compact_bracket_layers(master_paths, bracket_layers):
+    """
+    Replace bracket layers whose outlines equal their master layer by None, the master layer
+    stands in for them. Identical bracket layers of different masters all stay: a missing one
+    falls back to its own master layer, not to a sibling. A group whose layers would all be
+    dropped keeps its first one, so resolved_bracket_layers is unchanged: every other dropped
+    layer is replaced by an identical master layer.
+    """
+    compact = []
+    for paths, bracket in zip(master_paths, bracket_layers):
+        if bracket is not None and same_outline(bracket[1], paths):
+            compact.append(None)
+        else:
+            compact.append(bracket)
+    kept = {_rules_key(bracket[0]) for bracket in compact if bracket is not None}
+    for master, bracket in enumerate(bracket_layers):
+        if bracket is not None and compact[master] is None and _rules_key(bracket[0]) not in kept:
+            compact[master] = bracket
+            kept.add(_rules_key(bracket[0]))
+    return compact
+
+
+# --- Caching ---
+
+def _key_number(value):
+    return repr(round(float(value), 3))
+
+
+def generation_key(original_paths, width, settings, context=()):
+    """
+    Hash of everything that determines the generated layers of a glyph: the master 1
+    geometry and attributes, its width, the settings and any `context` such as master ids.
+    Stroke width and height are overwritten on every generated path and left out,
+    so a generated master 1 keeps the key of the source it was generated from.
+    """
+    digest = hashlib.sha1()
+    parts = [f"v{ENGINE_VERSION}", _key_number(width)]
+    parts.extend(str(item) for item in context)
+    parts.extend(_key_number(value) for value in (settings.original_offset, settings.min_stroke_width, settings.medium_stroke_width, settings.max_stroke_width))
+    parts.append(str(bool(settings.maintain_y_position)))
+    parts.append(f"lines={settings.line_count}")
+    if settings.line_widths:
+        parts.append(repr([[width if isinstance(width, str) else _key_number(width) for width in widths] for widths in settings.line_widths]))
+    digest.update('|'.join(parts).encode('utf-8'))
+    for path in original_paths:
+        attributes = ','.join(f"{key}={path.attributes[key]}" for key in sorted(path.attributes) if key not in GENERATED_ATTRIBUTES)
+        coordinates = path.coordinates
+        nodes = ' '.join(f"{_key_number(coordinates[2 * index])},{_key_number(coordinates[2 * index + 1])},{NODE_TYPES[code]},{int(bool(path.smooth[index]))}" for index, code in enumerate(path.types))
+        if path.node_data:
+            nodes += '|' + ' '.join(repr(sorted(data.items())) if data else '-' for data in path.node_data)
+        digest.update(f"\n{int(bool(path.closed))}|{attributes}|{nodes}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- Metrics ---
+
+def segments(path):
+    """Yield the segments of a path as lists of points: 2 for lines, 3-4 for curves"""
+    types = path.types
+    if not types:
+        return
+    coordinates = path.coordinates
+    if path.closed:
+        previous = (coordinates[-2], coordinates[-1])
+        start = 0
+    else:
+        previous = (coordinates[0], coordinates[1])
+        start = 1
+    handles = []
+    for index in range(start, len(types)):
+        point = (coordinates[2 * index], coordinates[2 * index + 1])
+        if types[index] == 'o':
+            handles.append(point)
+            continue
+        yield [previous] + handles + [point]
+        handles = []
+        previous = point
+
+
+def _cubic_extrema(p0, p1, p2, p3):
+    """Parameters in (0, 1) where one coordinate of a cubic has a local extremum"""
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    if abs(a) < 1e-12:
+        return [-c / b] if abs(b) > 1e-12 and 0 < -c / b < 1 else []
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return []
+    root = math.sqrt(discriminant)
+    return [t for t in ((-b + root) / (2 * a), (-b - root) / (2 * a)) if 0 < t < 1]
+
+
+def _cubic_point(p0, p1, p2, p3, t):
+    mt = 1 - t
+    return mt * mt * mt * p0 + 3 * mt * mt * t * p1 + 3 * mt * t * t * p2 + t * t * t * p3
+
+
+def _segment_point(points, t):
+    """Point and derivative of a line, quadratic or cubic segment at t"""
+    mt = 1 - t
+    if len(points) == 4:
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+        x = _cubic_point(x0, x1, x2, x3, t)
+        y = _cubic_point(y0, y1, y2, y3, t)
+        dx = 3 * mt * mt * (x1 - x0) + 6 * mt * t * (x2 - x1) + 3 * t * t * (x3 - x2)
+        dy = 3 * mt * mt * (y1 - y0) + 6 * mt * t * (y2 - y1) + 3 * t * t * (y3 - y2)
+    elif len(points) == 3:
+        (x0, y0), (x1, y1), (x2, y2) = points
+        x = mt * mt * x0 + 2 * mt * t * x1 + t * t * x2
+        y = mt * mt * y0 + 2 * mt * t * y1 + t * t * y2
+        dx = 2 * mt * (x1 - x0) + 2 * t * (x2 - x1)
+        dy = 2 * mt * (y1 - y0) + 2 * t * (y2 - y1)
+    else:
+        (x0, y0), (x1, y1) = points[0], points[-1]
+        x = x0 + (x1 - x0) * t
+        y = y0 + (y1 - y0) * t
+        dx = x1 - x0
+        dy = y1 - y0
+    return x, y, dx, dy
+
+
+def _segment_extrema(points):
+    """Parameters in (0, 1) where x or y of a segment has a local extremum"""
+    if len(points) == 4:
+        return _cubic_extrema(*(p[0] for p in points)) + _cubic_extrema(*(p[1] for p in points))
+    if len(points) == 3:
+        result = []
+        for axis in (0, 1):
+            denominator = points[0][axis] - 2 * points[1][axis] + points[2][axis]
+            if abs(denominator) > 1e-12:
+                t = (points[0][axis] - points[1][axis]) / denominator
+                if 0 < t < 1:
+                    result.append(t)
+        return result
+    return []
+
+
+def _skeleton_samples(path):
+    """
+    (x, y, tangent_x, tangent_y) at the ends and the x/y extrema of every segment.
+    Zero-length derivatives (retracted handles) fall back to the segment chord.
+    """
+    samples = []
+    for points in segments(path):
+        if len(points) > 4:
+            # Long off-curve runs (TrueType curves) are measured by their control points
+            points = [points[0], points[-1]]
+            hull = True
+        else:
+            hull = False
+        chord_x = points[-1][0] - points[0][0]
+        chord_y = points[-1][1] - points[0][1]
+        for t in [0.0] + sorted(_segment_extrema(points)) + [1.0]:
+            x, y, dx, dy = _segment_point(points, t)
+            length = math.hypot(dx, dy)
+            if length < 1e-9:
+                dx, dy = chord_x, chord_y
+                length = math.hypot(dx, dy)
+            if length < 1e-9:
+                samples.append((x, y, 0.0, 0.0))
+            else:
+                samples.append((x, y, dx / length, dy / length))
+        if hull:
+            samples.extend((x, y, 0.0, 0.0) for x, y in points[1:-1])
+    if not samples and path.types:
+        samples = [(x, y, 0.0, 0.0) for x, y in zip(path.coordinates[0::2], path.coordinates[1::2])]
+    return samples
+
+
+def skeleton_bounds(path):
+    """(xMin, yMin, xMax, yMax) of the path outline itself, None for empty paths"""
+    samples = _skeleton_samples(path)
+    if not samples:
+        return None
+    xs = [sample[0] for sample in samples]
+    ys = [sample[1] for sample in samples]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+# Line cap styles stored in lineCapStart / lineCapEnd
+CAP_BUTT = 0
+CAP_ROUND = 1
+CAP_ROUND_INSET = 2
+CAP_SQUARE = 3
+CAP_ALIGNED = 4
+
+
+def _attribute_number(attributes, key, default=0.0):
+    try:
+        return float(attributes.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _cap_points(x, y, tangent_x, tangent_y, half_x, half_y, cap):
+    """Extra outline points a line cap adds beyond the end at (x, y), tangent pointing outwards"""
+    normal_x, normal_y = tangent_y, -tangent_x
+    if cap == CAP_ROUND:
+        # Extremes of the pen ellipse on the outer half
+        candidates = ((x + half_x, y), (x - half_x, y), (x, y + half_y), (x, y - half_y))
+        return [(px, py) for px, py in candidates if (px - x) * tangent_x + (py - y) * tangent_y >= -1e-9]
+    if cap == CAP_SQUARE:
+        extend_x, extend_y = half_x * tangent_x, half_y * tangent_y
+        return [
+            (x + half_x * normal_x + extend_x, y + half_y * normal_y + extend_y),
+            (x - half_x * normal_x + extend_x, y - half_y * normal_y + extend_y),
+        ]
+    if cap == CAP_ALIGNED:
+        # End cut along the axis closest to perpendicular: stroke edges run on until they meet it
+        points = []
+        for sign in (1, -1):
+            edge_x, edge_y = x + sign * half_x * normal_x, y + sign * half_y * normal_y
+            if abs(tangent_y) >= abs(tangent_x) and abs(tangent_y) > 1e-9:
+                step = (y - edge_y) / tangent_y
+            elif abs(tangent_x) > 1e-9:
+                step = (x - edge_x) / tangent_x
+            else:
+                step = 0.0
+            points.append((edge_x + step * tangent_x, edge_y + step * tangent_y))
+        return points
+    return []
+
+
+def path_bounds(path):
+    """
+    Bounds of a path as drawn: open paths with a strokeWidth are measured as the stroke
+    outline, derived analytically from the skeleton instead of expanding the stroke.
+    The pen is strokeWidth wide and strokeHeight high; centered strokes (strokePos 0)
+    put half of it on each side, other strokes the full pen on one side, positive values
+    on the right-hand side of the path direction. Line caps extend the open ends.
+    """
+    if 'strokeWidth' not in path.attributes:
+        return skeleton_bounds(path)
+    samples = _skeleton_samples(path)
+    if not samples:
+        return None
+    attributes = path.attributes
+    stroke_width = _attribute_number(attributes, 'strokeWidth')
+    half_x = stroke_width / 2
+    half_y = _attribute_number(attributes, 'strokeHeight', stroke_width) / 2
+    position = _attribute_number(attributes, 'strokePos')
+    side = 0 if position == 0 else (1 if position > 0 else -1)
+
+    if path.closed:
+        caps = (CAP_BUTT, CAP_BUTT)
+    else:
+        caps = (int(_attribute_number(attributes, 'lineCapStart', CAP_BUTT)), int(_attribute_number(attributes, 'lineCapEnd', CAP_BUTT)))
+    last = len(samples) - 1
+
+    xs = []
+    ys = []
+    for index, (x, y, tangent_x, tangent_y) in enumerate(samples):
+        offset_x = half_x * tangent_y
+        offset_y = -half_y * tangent_x
+        center_x = x + side * offset_x
+        center_y = y + side * offset_y
+        # Aligned caps replace the corners of the end, the others add to them
+        if (index == 0 and caps[0] == CAP_ALIGNED) or (index == last and caps[1] == CAP_ALIGNED):
+            pass
+        else:
+            xs.append(center_x + offset_x)
+            xs.append(center_x - offset_x)
+            ys.append(center_y + offset_y)
+            ys.append(center_y - offset_y)
+        if not path.closed and index in (0, last):
+            outward = -1 if index == 0 else 1
+            for px, py in _cap_points(center_x, center_y, outward * tangent_x, outward * tangent_y, half_x, half_y, caps[0 if index == 0 else 1]):
+                xs.append(px)
+                ys.append(py)
+    if not xs:
+        return skeleton_bounds(path)
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _hull_bounds(path):
+    """
+    Box around all points of a path widened by the reach of its stroke, the drawn path never
+    leaves it: the pen center moves at most one pen half off the skeleton (strokePos), the
+    edges one more, and caps at most two from the center.
+    """
+    coordinates = path.coordinates
+    if not coordinates:
+        return None
+    xs = coordinates[0::2]
+    ys = coordinates[1::2]
+    margin = 0.0
+    attributes = path.attributes
+    if 'strokeWidth' in attributes:
+        stroke_width = _attribute_number(attributes, 'strokeWidth')
+        half = max(abs(stroke_width), abs(_attribute_number(attributes, 'strokeHeight', stroke_width))) / 2
+        margin = (2 if _attribute_number(attributes, 'strokePos') == 0 else 3) * half
+    return (min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+
+
+def layer_bounds(paths):
+    """
+    Union of the bounds of all paths of a layer, None for an empty layer.
+    Paths are measured from the widest down, and a path whose hull box already lies inside
+    the union can't extend it, so parallel lines of a stroke are mostly never sampled.
+    """
+    hulls = [(hull, path) for path in paths for hull in (_hull_bounds(path),) if hull is not None]
+    hulls.sort(key=lambda item: (item[0][2] - item[0][0]) + (item[0][3] - item[0][1]), reverse=True)
+    x_min = y_min = x_max = y_max = None
+    for hull, path in hulls:
+        if x_min is not None and hull[0] >= x_min and hull[1] >= y_min and hull[2] <= x_max and hull[3] <= y_max:
+            continue
+        bounds = path_bounds(path)
+        if bounds is None:
+            continue
+        if x_min is None:
+            x_min, y_min, x_max, y_max = bounds
+        else:
+            x_min = min(x_min, bounds[0])
+            y_min = min(y_min, bounds[1])
+            x_max = max(x_max, bounds[2])
+            y_max = max(y_max, bounds[3])
+    return None if x_min is None else (x_min, y_min, x_max, y_max)
+
+
+class BoundsCache:
+    """Layer bounds by a caller chosen layer key, computed once until the key is invalidated"""
+
+    def __init__(self):
+        self.bounds = {}
+
+    def get(self, key, paths):
+        if key not in self.bounds:
+            self.bounds[key] = layer_bounds(paths)
+        return self.bounds[key]
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.bounds.clear()
+        else:
+            self.bounds.pop(key, None)
+
+
+def sidebearing_proportion(lsb, rsb):
+    total_sidebearings = lsb + rsb
+    return lsb / total_sidebearings if total_sidebearings > 0 else 0.5
+
+
+def fitted_sidebearings(paths_width, width, proportion):
+    """(LSB, RSB) that give a layer with outlines `paths_width` wide the target `width`"""
+    total_sidebearings = width - paths_width
+    return total_sidebearings * proportion, total_sidebearings * (1 - proportion)
+
+
+def fit_sidebearings(bounds, width, proportion):
+    """
+    Horizontal shift that gives a layer with `bounds` the target `width`,
+    splitting the free space between LSB and RSB by `proportion`.
+    """
+    paths_width = bounds[2] - bounds[0]
+    total_sidebearings = width - paths_width
+    return total_sidebearings * proportion - bounds[0]
+
+
+def translate_paths(paths, dx, dy=0):
+    for path in paths:
+        path.translate(dx, dy)
+
+
+# --- Stroke outlines ---
+
+# Handle length of a cubic quarter ellipse, relative to its radius
+ELLIPSE_HANDLE = 0.5523
+
+
+def _reversed_run(points, types):
+    """An open run of nodes backwards, every on-curve node typed by the segment now ending at it"""
+    reversed_types = [''] * len(types)
+    following = 'l'
+    for index in range(len(types) - 1, -1, -1):
+        if types[index] == 'o':
+            reversed_types[index] = 'o'
+        else:
+            reversed_types[index] = following
+            following = types[index]
+    return points[::-1], reversed_types[::-1]
+
+
+def _reversed_contour(points, types):
+    """A closed contour backwards, still ending on an on-curve node"""
+    last = max(index for index, code in enumerate(types) if code != 'o')
+    points = points[last + 1:] + points[:last + 1]
+    types = types[last + 1:] + types[:last + 1]
+    run_points, run_types = _reversed_run([points[-1]] + points, ['l'] + types)
+    return run_points[1:], run_types[1:]
+
+
+def _cap_nodes(start, end, tangent_x, tangent_y, half_x, half_y, cap):
+    """
+    Nodes of a line cap from the stroke edge at `start` to the one at `end`, without
+    `start`, and the node type `end` gets. The tangent points away from the stroke.
+    Round inset and aligned caps are drawn as butt caps.
+    """
+    center_x = (start[0] + end[0]) / 2
+    center_y = (start[1] + end[1]) / 2
+    across_x = start[0] - center_x
+    across_y = start[1] - center_y
+    along_x = half_x * tangent_x
+    along_y = half_y * tangent_y
+    if cap == CAP_ROUND:
+        k = ELLIPSE_HANDLE
+        tip = (center_x + along_x, center_y + along_y)
+        points = [
+            (start[0] + k * along_x, start[1] + k * along_y),
+            (tip[0] + k * across_x, tip[1] + k * across_y),
+            tip,
+            (tip[0] - k * across_x, tip[1] - k * across_y),
+            (end[0] + k * along_x, end[1] + k * along_y),
+        ]
+        return points, ['o', 'o', 'c', 'o', 'o'], 'c'
+    if cap == CAP_SQUARE:
+        return [(start[0] + along_x, start[1] + along_y), (end[0] + along_x, end[1] + along_y)], ['l', 'l'], 'l'
+    return [], [], 'l'
+
+
+def _contour(points, types):
+    coordinates = array('d')
+    for x, y in points:
+        coordinates.append(x)
+        coordinates.append(y)
+    return Path(coordinates, ''.join(types), bytes(len(types)), True)
+
+
+def stroke_outline(path):
+    """
+    Closed contours that fill the stroke of a path, like Glyphs draws it: one contour around
+    an open path with its line caps, the two edges of a closed path in opposite directions.
+    The sides are the engine's anisotropic offsets, so every master of a compatible glyph
+    gets contours with the same nodes. Unstroked closed paths are returned as they are,
+    unstroked open paths draw nothing.
+    """
+    if path.node_count < 2:
+        return []
+    attributes = path.attributes
+    if 'strokeWidth' not in attributes:
+        return [_contour(list(zip(path.coordinates[0::2], path.coordinates[1::2])), path.types)] if path.closed else []
+    stroke_width = _attribute_number(attributes, 'strokeWidth')
+    half_x = stroke_width / 2
+    half_y = _attribute_number(attributes, 'strokeHeight', stroke_width) / 2
+    position = _attribute_number(attributes, 'strokePos')
+    side = 0 if position == 0 else (1 if position > 0 else -1)
+
+    index = NormalsIndex([path])
+    right = index.offset(0, *index.anisotropic_shifts(0, (side + 1) * half_x, (side + 1) * half_y))
+    left = index.offset(0, *index.anisotropic_shifts(0, (side - 1) * half_x, (side - 1) * half_y))
+    right_points = list(zip(right.coordinates[0::2], right.coordinates[1::2]))
+    left_points = list(zip(left.coordinates[0::2], left.coordinates[1::2]))
+    types = list(path.types)
+
+    if path.closed:
+        return [_contour(right_points, types), _contour(*_reversed_contour(left_points, types))]
+
+    last = path.node_count - 1
+    start_edge = index.outgoing[0]
+    end_edge = index.incoming[last]
+    if start_edge < 0:
+        return []
+    cap_start = int(_attribute_number(attributes, 'lineCapStart', CAP_BUTT))
+    cap_end = int(_attribute_number(attributes, 'lineCapEnd', CAP_BUTT))
+    end_points, end_types, end_type = _cap_nodes(right_points[-1], left_points[-1], index.direction_x[end_edge], index.direction_y[end_edge], half_x, half_y, cap_end)
+    back_points, back_types = _reversed_run(left_points, types)
+    back_types[0] = end_type
+    start_points, start_types, start_type = _cap_nodes(left_points[0], right_points[0], -index.direction_x[start_edge], -index.direction_y[start_edge], half_x, half_y, cap_start)
+    # Start on the second node of the right side, so the contour ends on an on-curve node
+    points = right_points[1:] + end_points + back_points + start_points + [right_points[0]]
+    types = types[1:] + end_types + back_types + start_types + [start_type]
+    return [_contour(points, types)]
+
+
+def reverse_contour(contour):
+    points, types = _reversed_contour(list(zip(contour.coordinates[0::2], contour.coordinates[1::2])), list(contour.types))
+    return _contour(points, types)
+
+
+def contour_area(contour):
+    """Signed area of the on-curve polygon of a closed contour, positive when counter-clockwise"""
+    coordinates = contour.coordinates
+    points = [(coordinates[2 * index], coordinates[2 * index + 1]) for index, code in enumerate(contour.types) if code != 'o']
+    area = 0.0
+    for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+        area += x0 * y1 - x1 * y0
+    return area / 2
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Runs the Multi Line Variable generation on a .glyphs file without GlyphsApp.
+
+    python multi_line_headless.py multi-template.glyphs -o output.glyphs --glyphs "A,B,a*"
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+import uuid
+from array import array
+
+import glyphs_plist
+from multi_line_cache import GlyphCache
+from multi_line_engine import Path, Settings, MASTER_COUNT, GENERATION_KEY, generate_glyph, compact_bracket_layers, line_stroke_widths, parse_line_widths, generation_key, layer_bounds, sidebearing_proportion, fit_sidebearings, translate_paths
+from multi_line_profile import NULL_PROFILER, Profiler
+
+# Glyph chunks handed to each worker process, more chunks balance uneven glyphs better
+CHUNKS_PER_JOB = 4
+
+
+# --- Conversion between .glyphs shapes and engine paths ---
+
+def path_from_shape(shape):
+    # Node codes in the file are the engine's type codes, with an 's' suffix for smooth nodes
+    nodes = shape.get('nodes', ())
+    coordinates = array('d')
+    for node in nodes:
+        coordinates.append(node[0])
+        coordinates.append(node[1])
+    types = ''.join(node[2][0] for node in nodes)
+    smooth = bytes(node[2].endswith('s') for node in nodes)
+    # A fourth element is the node's userData
+    node_data = tuple(dict(node[3]) if len(node) > 3 and node[3] else None for node in nodes)
+    return Path(coordinates, types, smooth, bool(shape.get('closed', 0)), dict(shape.get('attr', {})), node_data if any(node_data) else None)
+
+
+def _coordinate(value):
+    value = round(value, 3)
+    return int(value) if value == int(value) else value
+
+
+def shape_from_path(path):
+    shape = {}
+    if path.attributes:
+        shape['attr'] = {key: path.attributes[key] for key in sorted(path.attributes)}
+    shape['closed'] = 1 if path.closed else 0
+    coordinates = path.coordinates
+    shape['nodes'] = [(_coordinate(coordinates[2 * index]), _coordinate(coordinates[2 * index + 1]), code + ('s' if path.smooth[index] else '')) for index, code in enumerate(path.types)]
+    if path.node_data:
+        shape['nodes'] = [node + (dict(data),) if data else node for node, data in zip(shape['nodes'], path.node_data)]
+    return shape
+
+
+def is_path(shape):
+    return 'nodes' in shape
+
+
+# --- Font structure helpers ---
+
+def master_ids(font):
+    return [master['id'] for master in font.get('fontMaster', [])]
+
+
+def is_master_layer(layer, ids):
+    return layer.get('layerId') in ids and 'associatedMasterId' not in layer
+
+
+def master_layers(glyph, ids):
+    layers = {layer['layerId']: layer for layer in glyph.get('layers', []) if is_master_layer(layer, ids)}
+    return [layers.get(master_id) for master_id in ids]
+
+
+def bracket_layer_id(glyph_name, master_id):
+    # Deterministic so repeated runs produce identical files
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"multi-line/{glyph_name}/{master_id}/bracket")).upper()
+
+
+def axis_rules_list(axis_rules, axes):
+    """Convert {"a01": {"max": 100}} into the per-axis list used in the file"""
+    return [dict(axis_rules.get(f"a{index + 1:02d}", {})) for index in range(len(axes))] if axis_rules else []
+
+
+def bracket_layer_name(master, axis_rules, axes):
+    rules = []
+    for index, axis in enumerate(axes):
+        rule = axis_rules.get(f"a{index + 1:02d}")
+        if rule and 'max' in rule:
+            rules.append(f"{axis.get('tag', axis.get('name'))}<{rule['max']}")
+    return f"{master.get('name', master['id'])} [{','.join(rules)}]"
+
+
+def set_sorted_key(item, key, value):
+    """Set a key of a glyph or layer dict keeping the alphabetical key order Glyphs writes"""
+    if key in item:
+        item[key] = value
+        return
+    entries = list(item.items())
+    item.clear()
+    for existing_key, existing_value in entries:
+        if key is not None and existing_key > key:
+            item[key] = value
+            key = None
+        item[existing_key] = existing_value
+    if key is not None:
+        item[key] = value
+
+
+def glyph_matches(name, patterns):
+    """Glyph entries without a glyphname never match, they are left as they are"""
+    if name is None:
+        return False
+    return not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+# --- Generation ---
+
+def original_paths_of(font, glyph):
+    """Paths of the master 1 layer, None if a master layer is missing"""
+    layers = master_layers(glyph, master_ids(font))
+    if None in layers:
+        return None
+    return [path_from_shape(shape) for shape in layers[0].get('shapes', []) if is_path(shape)]
+
+
+def glyph_generation_key(font, glyph, settings, original_paths=None):
+    if original_paths is None:
+        original_paths = original_paths_of(font, glyph)
+    if not original_paths:
+        return None
+    context = [(master['id'], master.get('name')) for master in font.get('fontMaster', [])]
+    context.extend(axis.get('tag') for axis in font.get('axes', []))
+    width = master_layers(glyph, master_ids(font))[0].get('width', 0)
+    return generation_key(original_paths, width, settings, context)
+
+
+def stamp_glyph(glyph, key):
+    user_data = glyph.get('userData', {})
+    user_data[GENERATION_KEY] = key
+    set_sorted_key(glyph, 'userData', user_data)
+
+
+def is_up_to_date(glyph, key):
+    return key is not None and glyph.get('userData', {}).get(GENERATION_KEY) == key
+
+
+def bracket_layer(font, glyph, master, axis_rules, paths, width):
+    axes = font.get('axes', [])
+    return {
+        'associatedMasterId': master['id'],
+        'attr': {'axisRules': axis_rules_list(axis_rules, axes)},
+        'layerId': bracket_layer_id(glyph['glyphname'], master['id']),
+        'name': bracket_layer_name(master, axis_rules, axes),
+        'shapes': [shape_from_path(path) for path in paths],
+        'width': width,
+    }
+
+
+def process_glyph(font, glyph, settings, profiler=NULL_PROFILER, offset_cache=None, generation=None):
+    """
+    Regenerate masters and bracket layers of one glyph dict in place.
+    Bracket layers equal to their master layer are left out, see compact_bracket_layers.
+    An OffsetCache shares the offset paths with other runs over the same source.
+    `generation` is the glyph's generation key if the caller already has it.
+    Returns False when the glyph was skipped, else the layers and bytes saved that way.
+    """
+    with profiler.glyph(glyph['glyphname']):
+        ids = master_ids(font)
+        layers = master_layers(glyph, ids)
+        if None in layers:
+            print(f"{glyph['glyphname']}: missing master layer, skipped")
+            return False
+        layer1 = layers[0]
+        with profiler.stage('convert'):
+            original_paths = [path_from_shape(shape) for shape in layer1.get('shapes', []) if is_path(shape)]
+        if not original_paths:
+            return False
+        if generation is None:
+            with profiler.stage('key'):
+                generation = glyph_generation_key(font, glyph, settings, original_paths)
+
+        processed = None
+        if offset_cache is not None:
+            with profiler.stage('offset'):
+                processed = offset_cache.get(glyph['glyphname'], original_paths, settings)
+        master_paths, bracket_layers = generate_glyph(original_paths, settings, profiler=profiler, processed=processed)
+        with profiler.stage('compact_brackets'):
+            compact = compact_bracket_layers(master_paths, bracket_layers)
+
+        # Reference spacing comes from master 1, which keeps its original position
+        original_width = layer1.get('width', 0)
+        with profiler.stage('metrics'):
+            reference_bounds = layer_bounds(master_paths[0])
+            if reference_bounds is not None:
+                proportion = sidebearing_proportion(reference_bounds[0], original_width - reference_bounds[2])
+                for paths in master_paths[1:] + [bracket[1] for bracket in compact if bracket is not None]:
+                    bounds = layer_bounds(paths)
+                    if bounds is not None:
+                        translate_paths(paths, fit_sidebearings(bounds, original_width, proportion))
+
+        with profiler.stage('commit'):
+            # Delete non-master layers and replace the master shapes, anchors and hints stay like in the app
+            glyph['layers'] = [layer for layer in glyph['layers'] if is_master_layer(layer, ids)]
+            for layer in layers:
+                layer.pop('shapes', None)
+
+            for layer, paths in zip(layers, master_paths):
+                shapes = [shape_from_path(path) for path in paths]
+                if shapes:
+                    set_sorted_key(layer, 'shapes', shapes)
+                set_sorted_key(layer, 'width', original_width)
+
+            saved = {'layers_saved': 0, 'bytes_saved': 0}
+            for master, bracket, full in zip(font['fontMaster'], compact, bracket_layers):
+                if bracket is None:
+                    # Dropped layers are measured as they would have been written
+                    saved['layers_saved'] += 1
+                    saved['bytes_saved'] += len(glyphs_plist.dumps(bracket_layer(font, glyph, master, full[0], full[1], original_width)).encode('utf-8'))
+                    continue
+                glyph['layers'].append(bracket_layer(font, glyph, master, bracket[0], bracket[1], original_width))
+            stamp_glyph(glyph, generation)
+    return saved
+
+
+def font_context(font):
+    """The part of the font process_glyph needs, small enough to send to worker processes"""
+    return {'fontMaster': font.get('fontMaster', []), 'axes': font.get('axes', [])}
+
+
+def _process_chunk(task):
+    context, glyphs, keys, settings, profile = task
+    profiler = Profiler() if profile else NULL_PROFILER
+    saved = [process_glyph(context, glyph, settings, profiler, generation=key) for glyph, key in zip(glyphs, keys)]
+    return glyphs, saved, profiler.data() if profile else None
+
+
+def split_chunks(items, count):
+    """Split items into `count` contiguous chunks of nearly equal size"""
+    size, remainder = divmod(len(items), count)
+    chunks = []
+    start = 0
+    for index in range(count):
+        end = start + size + (1 if index < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return [chunk for chunk in chunks if chunk]
+
+
+def process_font(font, settings, patterns=None, jobs=1, cache=None, force=False, profiler=NULL_PROFILER, offset_cache=None):
+    """
+    Process every glyph matching `patterns`.
+    Glyphs whose generation key matches their stamp are skipped, glyphs found in
+    `cache` get their stored layers restored, the rest is generated. With jobs > 1
+    generation is split across worker processes and merged back in font order,
+    so the result is identical to a serial run. Worker timings are merged into `profiler`.
+    `offset_cache` (an OffsetCache) is only used by serial runs.
+    Returns a dict with the glyph names that were 'generated', 'restored' and 'skipped',
+    and the 'layers_saved' / 'bytes_saved' by leaving out redundant bracket layers.
+    """
+    if len(master_ids(font)) < MASTER_COUNT:
+        raise ValueError(f"Font needs {MASTER_COUNT} masters, found {len(master_ids(font))}")
+    glyphs = font.get('glyphs', [])
+    result = {'generated': [], 'restored': [], 'skipped': [], 'layers_saved': 0, 'bytes_saved': 0}
+    indices = []
+    # Generation keys of the glyphs to generate, computed once for the skip check and the stamp
+    keys = {}
+    for index, glyph in enumerate(glyphs):
+        name = glyph.get('glyphname')
+        if not glyph_matches(name, patterns):
+            continue
+        if not force:
+            with profiler.stage('key'):
+                key = glyph_generation_key(font, glyph, settings)
+            keys[index] = key
+            if is_up_to_date(glyph, key):
+                result['skipped'].append(name)
+                continue
+            cached_layers = cache.get(name, key) if cache is not None and key is not None else None
+            if cached_layers is not None:
+                glyph['layers'] = cached_layers
+                stamp_glyph(glyph, key)
+                result['restored'].append(name)
+                continue
+        indices.append(index)
+
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(indices))
+
+    if jobs <= 1:
+        generated = []
+        for index in indices:
+            saved = process_glyph(font, glyphs[index], settings, profiler, offset_cache, keys.get(index))
+            if saved:
+                generated.append((index, saved))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        context = font_context(font)
+        chunks = split_chunks(indices, jobs * CHUNKS_PER_JOB)
+        tasks = [(context, [glyphs[index] for index in chunk], [keys.get(index) for index in chunk], settings, profiler.enabled) for chunk in chunks]
+        generated = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # map() yields in submission order, which keeps the merge deterministic
+            for chunk, (results, saved_list, profile) in zip(chunks, executor.map(_process_chunk, tasks)):
+                if profile is not None:
+                    profiler.merge(profile)
+                for index, glyph, saved in zip(chunk, results, saved_list):
+                    glyphs[index] = glyph
+                    if saved:
+                        generated.append((index, saved))
+
+    for index, saved in generated:
+        glyph = glyphs[index]
+        result['generated'].append(glyph['glyphname'])
+        result['layers_saved'] += saved['layers_saved']
+        result['bytes_saved'] += saved['bytes_saved']
+        if cache is not None:
+            cache.put(glyph['glyphname'], glyph['userData'][GENERATION_KEY], glyph['layers'])
+    return result
+
+
+def settings_from_args(args):
+    return Settings(
+        original_offset=args.offset,
+        min_stroke_width=args.min,
+        medium_stroke_width=args.medium,
+        max_stroke_width=args.max,
+        maintain_y_position=not args.no_maintain_y,
+        line_count=args.lines,
+        line_widths=args.line_widths,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Multi Line Variable generation for .glyphs files")
+    parser.add_argument('source', help="input .glyphs file")
+    parser.add_argument('-o', '--output', help="output .glyphs file (default: overwrite source)")
+    parser.add_argument('--glyphs', help="comma separated glyph names or patterns, e.g. 'A,B,a*'")
+    parser.add_argument('--offset', type=float, default=-70, help="main offset (distance between lines)")
+    parser.add_argument('--min', type=float, default=10, help="minimum stroke width")
+    parser.add_argument('--medium', type=float, default=35, help="medium stroke width")
+    parser.add_argument('--max', type=float, default=60, help="maximum stroke width")
+    parser.add_argument('--no-maintain-y', action='store_true', help="offset centered strokes to one side only")
+    parser.add_argument('--lines', type=int, default=2, help="parallel lines per stroke (default: 2)")
+    parser.add_argument('--line-widths', type=parse_line_widths, help="stroke width of every line per master, e.g. 'min;min;medium,min,min;min,medium,max;max'")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="worker processes, 0 uses all cores (default: 1)")
+    parser.add_argument('--cache', help="cache file for generated layers, restored when a glyph and the settings are unchanged")
+    parser.add_argument('--force', action='store_true', help="regenerate glyphs even if they are up to date")
+    parser.add_argument('--check', action='store_true', help="check interpolation compatibility of the generated glyphs")
+    parser.add_argument('--profile', help="write per-stage and per-glyph timings to this JSON file")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    settings = settings_from_args(args)
+    if args.lines < 1:
+        parser.error("--lines must be at least 1")
+    try:
+        line_stroke_widths(settings)
+    except ValueError as error:
+        parser.error(str(error))
+    patterns = [pattern.strip() for pattern in args.glyphs.split(',') if pattern.strip()] if args.glyphs else None
+    start = time.time()
+    # Only the glyphs matching --glyphs are parsed, and only the ones that changed are rewritten
+    source = glyphs_plist.GlyphsFile(args.source)
+    font = source.font([name for name in source.names if glyph_matches(name, patterns)])
+    cache = GlyphCache(args.cache) if args.cache else None
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    result = process_font(font, settings, None, args.jobs, cache, args.force, profiler)
+    changed = set(result['generated']) | set(result['restored'])
+    source.save(args.output or args.source, [glyph for glyph in font['glyphs'] if glyph['glyphname'] in changed])
+    source.close()
+    if cache is not None:
+        cache.save()
+    if args.profile:
+        profiler.save(args.profile)
+        print(profiler.format_report())
+    if args.check and result['generated']:
+        from multi_line_compat import check_font, print_report
+        print_report(check_font(font, names=result['generated']), show_warnings=False)
+    print(f"Bracket layers: {result['layers_saved']} redundant layers left out, {result['bytes_saved']} bytes saved")
+    print(f"Generated {len(result['generated'])}, restored {len(result['restored'])}, skipped {len(result['skipped'])} glyphs in {time.time() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
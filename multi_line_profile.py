@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Opt-in timing of the generation stages.
+
+    profiler = Profiler()
+    with profiler.glyph("A"):
+        with profiler.stage('offset'):
+            ...
+    print(profiler.format_report())
+
+Functions take a profiler argument defaulting to NULL_PROFILER, whose contexts do nothing,
+so the hooks cost one empty with-statement per stage when profiling is off.
+"""
+
+import json
+import time
+
+# Glyphs listed in the report, slowest first
+SLOWEST_GLYPHS = 10
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class NullProfiler:
+    enabled = False
+
+    def glyph(self, name):
+        return _NULL_CONTEXT
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _StageTiming:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _GlyphTiming:
+    __slots__ = ('profiler', 'name', 'previous', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.previous = self.profiler.current
+        self.profiler.current = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        entry = self.profiler.glyph_entry(self.name)
+        entry['seconds'] += time.perf_counter() - self.start
+        self.profiler.current = self.previous
+        return False
+
+
+class Profiler:
+    """
+    Wall time and call count per stage, in total and per glyph.
+    Stages are attributed to the glyph of the innermost open glyph() context.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.glyphs = {}
+        self.current = None
+        self.start = time.perf_counter()
+
+    def glyph(self, name):
+        return _GlyphTiming(self, name)
+
+    def stage(self, name):
+        return _StageTiming(self, name)
+
+    def glyph_entry(self, name):
+        entry = self.glyphs.get(name)
+        if entry is None:
+            entry = self.glyphs[name] = {'seconds': 0.0, 'stages': {}}
+        return entry
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = [0.0, 0]
+        entry[0] += seconds
+        entry[1] += calls
+        if self.current is not None:
+            glyph_stages = self.glyph_entry(self.current)['stages']
+            glyph_stages[name] = glyph_stages.get(name, 0.0) + seconds
+
+    def data(self):
+        """Plain data, e.g. to send from a worker process to merge()"""
+        return {'stages': self.stages, 'glyphs': self.glyphs}
+
+    def merge(self, data):
+        for name, (seconds, calls) in data['stages'].items():
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+        for name, glyph in data['glyphs'].items():
+            entry = self.glyph_entry(name)
+            entry['seconds'] += glyph['seconds']
+            for stage, seconds in glyph['stages'].items():
+                entry['stages'][stage] = entry['stages'].get(stage, 0.0) + seconds
+
+    def report(self, slowest=SLOWEST_GLYPHS):
+        stages = {}
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            stages[name] = {'seconds': seconds, 'calls': calls, 'mean_seconds': seconds / calls if calls else 0.0}
+        ranked = sorted(self.glyphs.items(), key=lambda item: -item[1]['seconds'])[:slowest]
+        return {
+            'wall_seconds': time.perf_counter() - self.start,
+            'glyph_count': len(self.glyphs),
+            'glyph_seconds': sum(glyph['seconds'] for glyph in self.glyphs.values()),
+            'stages': stages,
+            'slowest_glyphs': [{'glyph': name, 'seconds': glyph['seconds'], 'stages': glyph['stages']} for name, glyph in ranked],
+        }
+
+    def format_report(self, slowest=SLOWEST_GLYPHS):
+        report = self.report(slowest)
+        lines = [f"Profile: {report['glyph_count']} glyphs, {report['wall_seconds']:.3f}s wall time"]
+        for name, stage in report['stages'].items():
+            lines.append(f"  {name:<16}{stage['seconds'] * 1000:>10.1f} ms{stage['calls']:>8} calls{stage['mean_seconds'] * 1000:>10.3f} ms/call")
+        if report['slowest_glyphs']:
+            lines.append("Slowest glyphs:")
+            for glyph in report['slowest_glyphs']:
+                worst = max(glyph['stages'].items(), key=lambda item: item[1], default=None)
+                detail = f" (mostly {worst[0]})" if worst else ""
+                lines.append(f"  {glyph['glyph']:<16}{glyph['seconds'] * 1000:>10.1f} ms{detail}")
+        return '\n'.join(lines)
+
+    def save(self, file_path, slowest=SLOWEST_GLYPHS):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(slowest), f, indent=2)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Renders proofing frames of an axis sweep from a generated .glyphs file, without exporting.
+
+    python multi_line_render.py output.glyphs --text "Multi" --sweep wght=99:200,wdth=99:200 --frames 240 -d frames
+
+Every frame is an SVG file with the text set at one location of the designspace, the
+locations run in a straight line from the start to the end values of --sweep
+(--bounce runs back again). Bracket layers switch in within their axis rules like in the
+exported font. Glyph deltas are computed once and the master weights once per frame for
+all glyphs, frames are written one at a time so long sweeps don't use more memory.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import glyphs_plist
+from multi_line_build import Designspace, output_layers, oriented_contours, unicodes, vertical_metrics
+from multi_line_compat import structure
+
+try:
+    from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+    from fontTools.varLib.models import VariationModel, normalizeValue
+except ImportError:
+    VariationModel = None
+
+# Space around the text in a frame, in font units
+MARGIN = 50
+
+
+class RenderSet:
+    """One interpolating layer set of a glyph: contour structure, deltas, and its region"""
+    __slots__ = ('types', 'deltas', 'box')
+
+    def __init__(self, types, deltas, box):
+        self.types = types
+        self.deltas = deltas
+        self.box = box
+
+    def contains(self, location):
+        return all(lower - 1e-9 <= location.get(tag, 0.0) <= upper + 1e-9 for tag, (lower, upper) in self.box.items())
+
+
+class RenderGlyph:
+    __slots__ = ('name', 'width', 'base', 'alternates')
+
+    def __init__(self, name, width, base, alternates):
+        self.name = name
+        self.width = width
+        self.base = base
+        self.alternates = alternates
+
+    def layer_set(self, location):
+        """The alternate whose axis rules contain the location, later groups win like in rvrn"""
+        for alternate in reversed(self.alternates):
+            if alternate.contains(location):
+                return alternate
+        return self.base
+
+
+def _points(contours):
+    return [(contour.coordinates[2 * index], contour.coordinates[2 * index + 1]) for contour in contours for index in range(contour.node_count)]
+
+
+def render_set(groups, model, box):
+    """RenderSet of one layer set; masters that don't interpolate render the default master"""
+    contours = oriented_contours(groups)
+    if len(set(structure(master_contours) for master_contours in contours)) != 1:
+        return RenderSet([contour.types for contour in contours[0]], [GlyphCoordinates(_points(contours[0]))], box)
+    deltas = model.getDeltas([GlyphCoordinates(_points(master_contours)) for master_contours in contours])
+    return RenderSet([contour.types for contour in contours[0]], deltas, box)
+
+
+def prepare_glyphs(font, designspace, model, names):
+    """RenderGlyph per glyph name, None for glyphs without all master layers or with broken components"""
+    glyphs = {glyph['glyphname']: glyph for glyph in font.get('glyphs', [])}
+    master_id = font['fontMaster'][designspace.masters[0]]['id']
+    prepared = {}
+    for name in names:
+        glyph = glyphs.get(name)
+        try:
+            layers = output_layers(font, glyph, designspace, glyphs) if glyph else None
+        except ValueError as error:
+            print(f"Skipped {name}: {error}")
+            layers = None
+        if layers is None:
+            prepared[name] = None
+            continue
+        width = next((layer.get('width', 0) for layer in glyph.get('layers', []) if layer.get('layerId') == master_id), 0)
+        sets = [render_set(groups, model, designspace.box(key) if key is not None else None) for _, key, groups in layers]
+        prepared[name] = RenderGlyph(name, width, sets[0], [item for item in sets[1:] if item.box is not None])
+    return prepared
+
+
+def interpolate(layer_set, scalars):
+    if len(layer_set.deltas) == 1:
+        return layer_set.deltas[0]
+    result = layer_set.deltas[0] * scalars[0]
+    for delta, scalar in zip(layer_set.deltas[1:], scalars[1:]):
+        if scalar:
+            result += delta * scalar
+    return result
+
+
+def svg_path(types, points, dx):
+    """SVG path data of closed contours in font coordinates, y flipped by the caller"""
+    commands = []
+    start = 0
+    for contour_types in types:
+        count = len(contour_types)
+        contour = points[start:start + count]
+        start += count
+        last_x, last_y = contour[-1]
+        commands.append(f"M{last_x + dx:.1f} {last_y:.1f}")
+        handles = []
+        for code, (x, y) in zip(contour_types, contour):
+            if code == 'o':
+                handles.append(f"{x + dx:.1f} {y:.1f}")
+                continue
+            if len(handles) == 2:
+                commands.append(f"C{handles[0]} {handles[1]} {x + dx:.1f} {y:.1f}")
+            elif len(handles) == 1:
+                commands.append(f"Q{handles[0]} {x + dx:.1f} {y:.1f}")
+            else:
+                commands.append(f"L{x + dx:.1f} {y:.1f}")
+            handles = []
+        commands.append("Z")
+    return ''.join(commands)
+
+
+def sweep_locations(designspace, sweep, frames, bounce=False):
+    """User space locations of the frames, in a straight line from the start to the end values"""
+    start = {tag: default for (tag, _), (_, default, _) in zip(designspace.axes, designspace.ranges)}
+    end = dict(start)
+    for tag, (first, last) in sweep.items():
+        start[tag] = first
+        end[tag] = last
+    steps = [index / (frames - 1) if frames > 1 else 0.0 for index in range(frames)]
+    if bounce:
+        steps = steps + steps[-2:0:-1]
+    for step in steps:
+        yield {tag: start[tag] + (end[tag] - start[tag]) * step for tag in start}
+
+
+def render_frames(font, text, locations, size=None):
+    """Yield (location, SVG document) per location, one frame at a time"""
+    designspace = Designspace(font)
+    tags = [tag for tag, _ in designspace.axes]
+    model = VariationModel(designspace.locations, axisOrder=tags)
+    names = glyph_names(font, text)
+    prepared = prepare_glyphs(font, designspace, model, sorted(set(names)))
+    line = [prepared[name] for name in names if prepared.get(name) is not None]
+    ascender, descender = vertical_metrics(font, designspace)
+    width = sum(glyph.width for glyph in line) + 2 * MARGIN
+    height = ascender - descender + 2 * MARGIN
+    size_attributes = f' width="{size * width / height:.0f}" height="{size}"' if size else ''
+    for location in locations:
+        normalized = {tag: normalizeValue(location[tag], axis_range) for tag, axis_range in zip(tags, designspace.ranges)}
+        scalars = model.getScalars(normalized)
+        parts = []
+        x = MARGIN
+        for glyph in line:
+            layer_set = glyph.layer_set(normalized)
+            parts.append(svg_path(layer_set.types, list(interpolate(layer_set, scalars)), x))
+            x += glyph.width
+        label = ' '.join(f"{tag}={value:g}" for tag, value in location.items())
+        yield location, (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}"{size_attributes}>'
+            f'<title>{label}</title><rect width="100%" height="100%" fill="white"/>'
+            f'<path transform="matrix(1 0 0 -1 0 {ascender + MARGIN})" d="{"".join(parts)}"/></svg>\n'
+        )
+
+
+def glyph_names(font, text):
+    """Glyph names of a text, /name sequences select glyphs by name"""
+    by_unicode = {}
+    for glyph in font.get('glyphs', []):
+        for code in unicodes(glyph):
+            by_unicode.setdefault(code, glyph['glyphname'])
+    if text.startswith('/'):
+        return [name.strip() for name in text.split('/') if name.strip()]
+    return [by_unicode[ord(character)] for character in text if ord(character) in by_unicode]
+
+
+def parse_sweep(text):
+    """'wght=99:200,wdth=99:200' as {tag: (start, end)}"""
+    sweep = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        tag, values = item.split('=')
+        start, end = values.split(':')
+        sweep[tag.strip()] = (float(start), float(end))
+    return sweep
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render SVG frames of an axis sweep from a generated .glyphs file")
+    parser.add_argument('source', help=".glyphs file")
+    parser.add_argument('--text', default="Multi", help="text to set, or glyph names like '/A/B.alt'")
+    parser.add_argument('--sweep', type=parse_sweep, default={}, help="axis values to run through, e.g. 'wght=99:200,wdth=99:200' (default: all axes over their full range)")
+    parser.add_argument('--frames', type=int, default=60, help="frames from start to end (default: 60)")
+    parser.add_argument('--bounce', action='store_true', help="run back to the start")
+    parser.add_argument('--size', type=int, help="frame height in pixels")
+    parser.add_argument('-d', '--directory', default="frames", help="output folder (default: frames)")
+    args = parser.parse_args(argv)
+    if VariationModel is None:
+        print("fontTools is required to render frames: pip install fonttools")
+        return 1
+
+    start = time.time()
+    font = glyphs_plist.load(args.source)
+    designspace = Designspace(font)
+    sweep = args.sweep or {tag: (minimum, maximum) for (tag, _), (minimum, _, maximum) in zip(designspace.axes, designspace.ranges)}
+    os.makedirs(args.directory, exist_ok=True)
+    count = 0
+    for count, (_, document) in enumerate(render_frames(font, args.text, sweep_locations(designspace, sweep, max(1, args.frames), args.bounce), args.size), 1):
+        with open(os.path.join(args.directory, f"frame_{count:05d}.svg"), 'w', encoding='utf-8') as f:
+            f.write(document)
+    print(f"Rendered {count} frames into {args.directory} in {time.time() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
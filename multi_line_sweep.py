@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+__doc__="""
+Generates one font per combination of offset and stroke widths from one template.
+
+    python multi_line_sweep.py multi-template.glyphs --offset=-70,-50 --min 10,20 --medium 35 --max 60,80 -d variants -j 4
+
+Each variant is the headless run with its settings, written as <template>_o<offset>_w<min>-<medium>-<max>.glyphs
+(--ttf also compiles it with multi_line_build). The template is parsed once per worker
+process, variants with the same offset go to the same worker and share its offset paths,
+only the stroke widths are applied per variant. index.json lists every output with its
+settings and timings, and every combination that was left out with the reason.
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import sys
+import time
+
+import glyphs_plist
+from multi_line_engine import Settings, OffsetCache, line_stroke_widths, parse_line_widths
+from multi_line_headless import process_font
+
+# Template and offset cache of a worker process, loaded by _init_worker
+_WORKER = {}
+
+# Reason of the width combinations settings_grid leaves out
+WIDTH_ORDER_REASON = "min <= medium <= max doesn't hold"
+
+
+def number_list(text):
+    return [float(item) for item in text.split(',') if item.strip()]
+
+
+def _number(value):
+    return f"{value:g}"
+
+
+def variant_name(stem, settings):
+    return f"{stem}_o{_number(settings.original_offset)}_w{_number(settings.min_stroke_width)}-{_number(settings.medium_stroke_width)}-{_number(settings.max_stroke_width)}"
+
+
+def settings_entry(settings):
+    return {
+        'original_offset': settings.original_offset,
+        'min_stroke_width': settings.min_stroke_width,
+        'medium_stroke_width': settings.medium_stroke_width,
+        'max_stroke_width': settings.max_stroke_width,
+        'maintain_y_position': settings.maintain_y_position,
+        'line_count': settings.line_count,
+        'line_widths': settings.line_widths,
+    }
+
+
+def settings_grid(offsets, minimums, mediums, maximums, maintain_y_position=True, line_count=2, line_widths=None):
+    """
+    (settings of every combination grouped by offset, [(settings, reason)] of the combinations
+    left out), width combinations that aren't min <= medium <= max are left out.
+    """
+    groups = {}
+    skipped = []
+    for offset, minimum, medium, maximum in itertools.product(offsets, minimums, mediums, maximums):
+        settings = Settings(offset, minimum, medium, maximum, maintain_y_position, line_count, line_widths)
+        if not minimum <= medium <= maximum:
+            skipped.append((settings, WIDTH_ORDER_REASON))
+            continue
+        groups.setdefault(offset, []).append(settings)
+    return list(groups.values()), skipped
+
+
+def split_tasks(groups, jobs):
+    """Offset groups, split further while there are fewer tasks than worker processes"""
+    tasks = [group for group in groups if group]
+    while len(tasks) < jobs:
+        largest = max(range(len(tasks)), key=lambda index: len(tasks[index]))
+        group = tasks[largest]
+        if len(group) < 2:
+            break
+        half = len(group) // 2
+        tasks[largest:largest + 1] = [group[:half], group[half:]]
+    return tasks
+
+
+def _init_worker(source):
+    _WORKER['template'] = glyphs_plist.load(source)
+    _WORKER['offset_cache'] = OffsetCache()
+
+
+def build_variant(settings, directory, stem, ttf=False):
+    """Generate (and compile) one variant from the worker's template, returns its index entry"""
+    start = time.perf_counter()
+    font = copy.deepcopy(_WORKER['template'])
+    offset_cache = _WORKER['offset_cache']
+    hits = offset_cache.hits
+    result = process_font(font, settings, force=True, offset_cache=offset_cache)
+    name = variant_name(stem, settings)
+    file_path = os.path.join(directory, name + ".glyphs")
+    glyphs_plist.dump(font, file_path)
+    entry = {
+        'name': name,
+        'file': os.path.basename(file_path),
+        'settings': settings_entry(settings),
+        'generated': len(result['generated']),
+        'offset_cache_hits': offset_cache.hits - hits,
+        'generate_seconds': time.perf_counter() - start,
+    }
+    if ttf:
+        from multi_line_build import build_font
+
+        build_start = time.perf_counter()
+        ttfont, _ = build_font(font)
+        ttfont.save(os.path.join(directory, name + ".ttf"))
+        entry['ttf'] = name + ".ttf"
+        entry['build_seconds'] = time.perf_counter() - build_start
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def _run_task(task):
+    settings_list, directory, stem, ttf = task
+    return [build_variant(settings, directory, stem, ttf) for settings in settings_list]
+
+
+def run_sweep(source, groups, directory, jobs=1, ttf=False):
+    """Index entries of all variants, in grid order"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    os.makedirs(directory, exist_ok=True)
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    tasks = split_tasks(groups, jobs)
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        _init_worker(source)
+        return [entry for settings_list in tasks for entry in _run_task((settings_list, directory, stem, ttf))]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(source,)) as executor:
+        for results in executor.map(_run_task, [(settings_list, directory, stem, ttf) for settings_list in tasks]):
+            entries.extend(results)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate one font per combination of offset and stroke widths")
+    parser.add_argument('source', help="template .glyphs file")
+    parser.add_argument('--offset', type=number_list, default=[-70], help="comma separated offsets, written as --offset=-70,-50 (default: -70)")
+    parser.add_argument('--min', type=number_list, default=[10], help="comma separated minimum stroke widths (default: 10)")
+    parser.add_argument('--medium', type=number_list, default=[35], help="comma separated medium stroke widths (default: 35)")
+    parser.add_argument('--max', type=number_list, default=[60], help="comma separated maximum stroke widths (default: 60)")
+    parser.add_argument('--no-maintain-y', action='store_true', help="offset centered strokes to one side only")
+    parser.add_argument('--lines', type=int, default=2, help="parallel lines per stroke (default: 2)")
+    parser.add_argument('--line-widths', type=parse_line_widths, help="stroke width of every line per master, see multi_line_headless.py")
+    parser.add_argument('-d', '--directory', default="variants", help="output folder (default: variants)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="worker processes, 0 uses all cores (default: 1)")
+    parser.add_argument('--ttf', action='store_true', help="also compile every variant into a variable TTF (needs fontTools)")
+    args = parser.parse_args(argv)
+    if args.lines < 1:
+        parser.error("--lines must be at least 1")
+    try:
+        line_stroke_widths(Settings(line_count=args.lines, line_widths=args.line_widths))
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.time()
+    groups, skipped = settings_grid(args.offset, args.min, args.medium, args.max, not args.no_maintain_y, args.lines, args.line_widths)
+    stem = os.path.splitext(os.path.basename(args.source))[0]
+    skipped_entries = [{'name': variant_name(stem, settings), 'settings': settings_entry(settings), 'skipped': reason} for settings, reason in skipped]
+    entries = run_sweep(args.source, groups, args.directory, args.jobs, args.ttf)
+    index = {
+        'source': os.path.abspath(args.source),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'jobs': args.jobs,
+        'seconds': time.time() - start,
+        'variants': entries,
+        'skipped': skipped_entries,
+    }
+    with open(os.path.join(args.directory, "index.json"), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    for entry in entries:
+        print(f"  {entry['file']:<48}{entry['seconds']:>8.2f}s")
+    for entry in skipped_entries:
+        print(f"  {entry['name']:<48}skipped: {entry['skipped']}")
+    print(f"Generated {len(entries)} variants into {args.directory} in {time.time() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())